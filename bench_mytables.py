@@ -0,0 +1,111 @@
+"""
+Benchmarks of the mytables module (not part of the library)
+
+	> python bench_mytables.py write
+	> python bench_mytables.py write 100000 4
+	> python bench_mytables.py import
+
+bench_write -- rows/s of the csv/ascii/latex block writer against the
+	       former row by row loop (_writeRows)
+bench_import -- time of "import mytables" in a new interpreter and
+	       optional modules loaded by the import
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import numpy
+import mytables
+
+
+def _writeRows(data, unit, delimiter=' ', eol='\n'):
+	"""
+	-- Internal use --
+	Row by row writer (former mytables writer, reference implementation)
+	"""
+	keys = numpy.sort(data.keys())
+	size = numpy.size(data[data.keys()[0]])
+	for ik in range(size):
+		txt = str(data[keys[0]][ik])
+		for k in keys[1:]: txt+=delimiter+str(data[k][ik])
+		unit.write(txt+eol)
+
+
+def bench_write(nrows=1000000, ncols=10, blocksize=50000, delimiter=','):
+	""" Compare the rows/s of the block writer used by the csv/ascii/latex
+	managers against the former row by row loop.
+	inputs:
+		nrows     -- number of rows of the test table
+		ncols     -- number of columns (half floats, half integers)
+	keywords:
+		blocksize -- number of rows per written block
+		delimiter -- column delimiter
+	outputs:
+		dictionary of rows/s for each writer
+	"""
+	t = mytables.Table(name='bench')
+	for k in range(ncols):
+		if k % 2:
+			t.addCol(numpy.arange(nrows), name='i%d' % k)
+		else:
+			t.addCol(numpy.random.normal(size=nrows), name='f%d' % k, format='%.6g')
+	fd, fname = tempfile.mkstemp(suffix='.csv')
+	os.close(fd)
+	res = {}
+	try:
+		for name, func in [ ('rows', lambda u: _writeRows(t.data, u, delimiter=delimiter)),
+				    ('blocks', lambda u: mytables._writeTextBlocks(t.data, u, delimiter=delimiter, blocksize=blocksize)) ]:
+			unit = open(fname, 'w')
+			t0 = time.time()
+			func(unit)
+			unit.close()
+			res[name] = nrows / (time.time() - t0)
+			print "%10s writer: %12.0f rows/s" % (name, res[name])
+	finally:
+		os.remove(fname)
+	print "speedup: %.1f" % (res['blocks'] / res['rows'])
+	return res
+
+
+def bench_import(repeat=5, python=None):
+	""" Measure the time of "import mytables" in new interpreters (as
+	short-lived worker processes do) against an empty interpreter start.
+	keywords:
+		repeat -- number of measurements (the best one is kept)
+		python -- interpreter to use (def: sys.executable)
+	outputs:
+		dictionary of the best times in seconds ('python', 'import')
+		and the list of optional modules loaded by the import
+	"""
+	python = python or sys.executable
+	env = dict(os.environ)
+	path = os.path.dirname(os.path.abspath(mytables.__file__))
+	env['PYTHONPATH'] = os.pathsep.join([path] + \
+			[ k for k in env.get('PYTHONPATH', '').split(os.pathsep) if k ])
+	optional = ['pyfits', 'tables', 'sqlite3', 'scipy', 'mypickleshare']
+	code = 'import sys, mytables; print " ".join([ k for k in %r if k in sys.modules ])' % optional
+	res = {}
+	for name, cmd in [ ('python', 'pass'), ('import', code) ]:
+		best = None
+		for k in range(repeat):
+			t0 = time.time()
+			out = subprocess.check_output([python, '-c', cmd], env=env)
+			dt = time.time() - t0
+			if (best is None) or (dt < best):
+				best = dt
+		res[name] = best
+		print "%10s: %8.3f s" % (name, best)
+	res['modules'] = out.split()
+	print "mytables import: %.3f s, optional modules loaded: %s" % \
+			(res['import'] - res['python'], ', '.join(res['modules']) or 'none')
+	return res
+
+
+_benchmarks = { 'write': bench_write, 'import': bench_import }
+
+if __name__ == '__main__':
+	if (len(sys.argv) < 2) or (not sys.argv[1] in _benchmarks):
+		print __doc__
+		sys.exit(1)
+	_benchmarks[sys.argv[1]](*[ int(k) for k in sys.argv[2:] ])
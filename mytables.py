@@ -33,16 +33,21 @@ DESCRIPTION:
     >t = Table()	 
     	t()		  perfom simple column operations and return results
 	t.addCol()        add a new Column to the current table
+	t.addVirtualCol() add a column computed from an expression on access
+	t.appendRows()    append rows to the table (amortized growth)
 	t.delCol()	  delete a given column from the table
 	t.disp()       	  pretty print (part of) the table 
 	t.getCol()	  returns a given column (tuple of columns)
+	t.getColHeader()  returns the header of a given column
+	t.createIndex()	  creates a sorted index of a column used by where()
+			  (the column is copied, read-only until removeIndex)
 	t.getRow()	  returns a given row (tuple of rows as record arrays)
+	t.groupby()	  returns groups of rows sharing the same key values 
+			  (TableGroupBy) to compute statistics per group
 	t.data		  contains a dictionary of columns
 	t.evalexpr()   	  let you do some simple operations on the table using
 		    	  column names as variables (incl. math symbols) and
-		    	  external variables as well
-		    	  TODO: need to find a way to extend math functions to
-		    	  arrays
+		    	  external variables as well (see compileExpr)
 	t.extract()    	  Returns a sub-table based on a given selection of
 		    	  lines or fields
 	t.header	  header of the table (each column has its own header)
@@ -54,11 +59,12 @@ DESCRIPTION:
 	t.selectWhere()   is equivalent to Table[where()] and return a table
 		    	  with only matching conditions (can also restrict 
 		    	  selected	fields)
+	t.view()	  returns a lazy selection of lines/fields (TableView)
 	t.setComment()	  add a comment to a given column
 	t.setUnit()	  set the unit of a given column
 	t.source	  if set, it contains the source file object related to
 			  the source format of the table (e.g. in hd5 formats)
-	t.stats()	  returns statistics of the different columns (requires mystats)
+	t.stats()	  returns statistics of the different columns
 	t.where()      	  traditional where function based on evalexpr
 	t.write()	  write the current table to a given file (including
 			  format (from either a regitered format or a given tableManager
@@ -71,7 +77,6 @@ REQUIREMENTS:
 	numpy		mandatory
 	pyfits 		for using fits extensions
 	pytables	for using hdf5 extensions
-	mystats		for computing statistics on the table columns (t.stats())
 	mypickleshare	for distributed tables
 	sqlite3		for sqltables
 
@@ -164,18 +169,115 @@ HISTORY:
 	added features;
 		sqltables are now managed through sqlManager nd sqlite3
 		you can use it to load or generate sqlite tables. 
+	0.7.0 -- 18/10/2026
+	added features:
+		iterload    -- reads csv/ascii files by chunks of rows
+			       (TableManager.iterread) with a bounded memory
+			       usage. The file header is parsed only once.
+		csv/ascii/latex writers format whole blocks of rows at once
+			       using the column formats (header.format).
+			       bench_mytables.py compares it to the former writer.
+		hd5Manager.write appends structured arrays by chunks of rows
+		hd5Writer   -- streams Table chunks into a single HDF5 table
+		lazy tables -- hdf5, sqlite and ctab tables are read lazily (def),
+			       fits tables with lazy=True: columns are then
+			       TableColumnProxy objects that are read on first
+			       access (TableColumnDict)
+		fits tables can be memory mapped (memmap=True): columns are
+			       then views of the binary table (no copy).
+		sqlManager.write inserts rows by batches (executemany) within
+			       a single transaction, can append to an existing
+			       table and create indexes after loading.
+		sqlManager.read fetches all the columns with a single query
+			       into typed arrays and accepts columns and where
+			       selections.
+		where/selectWhere evaluate simple conditions directly in the
+			       hdf5 (in-kernel) or sqlite (SQL) sources
+			       (TableManager.getWhereList/readWhere)
+		evalexpr    -- expressions are parsed and compiled once
+			       (compileExpr, TableExpression), names are
+			       resolved from the syntax tree and element-wise
+			       expressions are evaluated by blocks of rows.
+			       math functions now apply to arrays.
+		match/join  -- sort-merge matching (no more N x M matrix),
+			       multi-column keys, many-to-many matches and
+			       inner, left, right and outer joins.
+		extract     -- slices and field selections are views on the
+			       parent data with copied column headers
+			       (Table slices t[i:j] now return Tables).
+		TableView   -- lazy row selections (t.view, selectWhere(view=True))
+			       gathering the columns only when read.
+		npyManager  -- numpy directory tables (npyd): one .npy file per
+			       column and a JSON header. Columns are memory
+			       mapped on reading.
+		ctabManager -- chunked compressed columnar tables (ctab) with
+			       per-chunk min/max/null statistics used to skip
+			       chunks in where/selectWhere.
+		stats       -- single sort per column for quantiles and hpd,
+			       one pass moments, columns processed in
+			       parallel threads (mystats is not required).
+		groupby     -- TableGroupBy: sort-based grouping on one or
+			       multiple keys and reductions per group (agg).
+		createIndex -- sorted column indexes used by where/selectWhere
+			       (binary searches), stored with npyd and hdf5
+			       sources.
+		compressed  -- gzip, bzip2 and xz (if lzma is available) text
+			       files (e.g. cat.csv.gz) are read and written
+			       on the fly, also by blocks with iterload.
+		loadmany    -- concurrent loading and concatenation of several
+			       files sharing the same schema.
+		vstack      -- row concatenation of tables (one allocation per
+			       column), Table.appendRows with capacity
+			       doubling buffers.
+		enableCache -- opt-in parse cache of text tables: parsed columns
+			       are stored as npyd tables keyed by path, size
+			       and modification time and memory mapped on the
+			       next reads (invalidateCache, size eviction).
+		distributedTable -- columns are stored as .npy files read as
+			       memory maps (TableColumnStore), only the
+			       metadata are kept in the PickleShareDB.
+		imports     -- pyfits, tables, sqlite3, scipy.io and mypickleshare
+			       are imported on first use of their format:
+			       managers can be registered by class name
+			       (register_extension), no more messages at
+			       import (bench_mytables.py import).
+		parallel text -- csv/ascii read(processes=N) parses byte ranges
+			       of the data in a pool of processes, column
+			       types are agreed from a sampled pre-pass.
+		addVirtualCol -- virtual columns defined by an expression,
+			       computed on access and cached until a column
+			       they use changes, written only if requested.
 """
 import warnings
 import numpy
 import os
 from math import *
 import cStringIO,operator
+import itertools
+import glob
+import ast, re
+import math as _math
+import json
+import importlib
+import gzip, bz2
+import hashlib, shutil
+import UserDict
+try:
+	import lzma
+except ImportError:
+	lzma = None
 
 __version__ = '0.6.0'
 __author__  = 'M. Fouesneau'
 
 global _extensions
 
+# optional dependencies, imported on first use (see _require)
+pyfits  = None		# fits tables
+tables  = None		# hdf5 tables (pytables)
+sqlite3 = None		# sqlite tables
+io      = None		# IDL save files (scipy.io)
+mps     = None		# distributed tables (mypickleshare)
 
 #==============================================================================
 # COMMON functions
@@ -188,6 +290,9 @@ def register_extension(manager=None,extName=None,
 	    inputs: 
 		can be either a TableManager object or individual functions
 		manager --  TableManager Object
+			    or the name of a TableManager class of this
+			    module: the manager (and its dependencies) is
+			    then only created on first use of the extension
 		extName --  register a particular extension if provided
 		            (required if not giving a TableManager as input)
 		readerFunction -- function that is required to do the reading
@@ -211,10 +316,10 @@ def register_extension(manager=None,extName=None,
 	    keywords:
 		override -- redefine the file manager if already registered. 
 	"""
-	extName = extName or manager.tableType
+	extName = extName or getattr(manager, 'tableType', None)
 	if not extName in _extensions or override:
 		if manager != None:	
-			assert(isinstance(manager, TableManager))
+			assert(isinstance(manager, (TableManager, str)))
 			_extensions[extName] = manager
 		else:
 			assert((readerFunction != None) & (writerFunction != None))
@@ -224,6 +329,36 @@ def register_extension(manager=None,extName=None,
 	else:
 		raise Exception("Type %s is already defined" % ttype)
 
+def _require(module, name=None):
+	""" 
+	-- Internal use --
+	imports an optional dependency on first use and stores it as a global
+	of this module (name, def: module) 
+	"""
+	name = name or module
+	g = globals()
+	if g.get(name, None) is None:
+		try:
+			g[name] = importlib.import_module(module)
+		except ImportError, e:
+			raise ImportError("%s is required (%s)" % (module, e))
+	return g[name]
+
+def _getManager(extName):
+	""" 
+	-- Internal use --
+	returns the manager of a registered extension, creating the managers
+	registered by name on first use 
+	"""
+	manager = _extensions[extName]
+	if isinstance(manager, str):
+		name = manager
+		manager = globals()[name]()
+		for k, v in _extensions.items():
+			if v == name:
+				_extensions[k] = manager
+	return manager
+
 def _isiterable(val):
 	""" determine if a given object is either iterable
 		returns a boolean
@@ -237,6 +372,46 @@ def _isiterable(val):
 		return False
 	"""
 
+def _threadMap(func, items, threads=None):
+	""" 
+	-- Internal use --
+	map func over items using a pool of threads
+	(threads defaults to the number of cpus, 1 means no thread)
+	"""
+	items = list(items)
+	if threads is None:
+		import multiprocessing
+		threads = multiprocessing.cpu_count()
+	if (threads <= 1) or (len(items) <= 1):
+		return map(func, items)
+	from multiprocessing.pool import ThreadPool
+	pool = ThreadPool(min(threads, len(items)))
+	try:
+		return pool.map(func, items)
+	finally:
+		pool.close()
+		pool.join()
+
+_compressions = ['gz', 'bz2', 'bzip2', 'xz']
+
+def _openFile(filename, mode='r'):
+	""" 
+	-- Internal use --
+	Opens a file. gzip (.gz), bzip2 (.bz2) and xz (.xz, requires lzma)
+	files are decompressed (or compressed) on the fly, without any
+	temporary file. 
+	"""
+	extension = filename.lower().split('.')[-1]
+	if extension == 'gz':
+		return gzip.open(filename, mode + 'b')
+	elif extension in ['bz2', 'bzip2']:
+		return bz2.BZ2File(filename, mode + 'b')
+	elif extension == 'xz':
+		if lzma is None:
+			raise Exception('xz files require the lzma module')
+		return lzma.open(filename, mode + 'b')
+	return open(filename, mode)
+
 def _determine_type(_extensions, string, verbose=True):
 	""" 
 	Determine the type of a table from its extension and try to give the
@@ -249,13 +424,18 @@ def _determine_type(_extensions, string, verbose=True):
 		extension = s
 	else:
 		extension = s.split('.')[-1]
-		if extension in ['gz', 'bzip2', 'Z']:
-			raise Exception('Compressed files are not managed yet.')
+		if extension == 'z':
+			raise Exception('Compressed files (.Z) are not managed, use gzip, bzip2 or xz.')
+		elif (extension in _compressions) and (s.count('.') > 1):
+			#compressed file: the type is given by the inner extension
+			extension = s.split('.')[-2]
+		elif extension in _compressions:
+			raise Exception('Compressed files require the extension of the table type (e.g. cat.csv.gz).')
 		elif extension in ['sav', 'idl', 'idlsav']:
 			raise Exception('Warning: IDL save files must be explicitely requested with "idlload" independent function.')
 			
 	if extension in _extensions:
-		tableType = _extensions[extension]
+		tableType = _getManager(extension)
 		if verbose:
 			print "Auto-detected type: %s" % extension
 	else:
@@ -263,6 +443,427 @@ def _determine_type(_extensions, string, verbose=True):
 	return tableType
 
 
+#==============================================================================
+# Condition translation (predicate pushdown)
+#==============================================================================
+
+_cmpOps = { ast.Eq: ('==', '='), ast.NotEq: ('!=', '<>'),
+	    ast.Lt: ('<', '<'),   ast.LtE: ('<=', '<='), 
+	    ast.Gt: ('>', '>'),   ast.GtE: ('>=', '>=') }
+_arithOps = { ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/' }
+
+def _translateCondition(condition, colnames, condvars=None, dialect='numexpr'):
+	""" 
+	-- Internal use --
+	Translate a simple condition on columns into an expression that the
+	table source can evaluate by itself.
+	Only comparisons, logical (&, |, ~, and, or, not) and arithmetic
+	operations on columns, numbers, strings and scalar external
+	variables are translated.
+	In SQL, comparisons with NULL values are NULL and stay NULL under
+	NOT, while in memory NULL values are NaN: comparisons are False
+	(True for !=) and negations are True. Comparisons whose NULL result
+	would not select the same rows are given their in-memory value
+	(coalesce), the others are kept as is so that SQL indexes are used.
+
+	inputs:
+		condition -- python condition string (e.g. '(x > 3) & (y < a)')
+		colnames  -- names that refer to source columns
+	keywords:
+		condvars  -- dictionary of external variables
+		dialect   -- 'numexpr' (PyTables in-kernel queries) or 'sql'
+	outputs:
+		(expression, variables) or None if the condition cannot be
+		translated. variables is a dictionary for numexpr and a list of
+		parameters (? placeholders) for sql.
+	"""
+	sql = (dialect == 'sql')
+	condvars = condvars or {}
+	if sql:
+		params = []
+	else:
+		params = {}
+
+	def value(v):
+		if not numpy.isscalar(v):
+			raise ValueError('non scalar variable')
+		if hasattr(v, 'item'):
+			v = v.item()
+		if sql:
+			params.append(v)
+			return '?'
+		return v
+
+	def visit(node, negated=False):
+		#negated: the node is under an odd number of negations
+		if isinstance(node, ast.BoolOp):
+			if isinstance(node.op, ast.And):
+				op = sql and ' AND ' or ' & '
+			else:
+				op = sql and ' OR ' or ' | '
+			return '(' + op.join([ visit(k, negated) for k in node.values ]) + ')'
+		elif isinstance(node, ast.BinOp):
+			if isinstance(node.op, ast.BitAnd):
+				op = sql and 'AND' or '&'
+			elif isinstance(node.op, ast.BitOr):
+				op = sql and 'OR' or '|'
+			elif type(node.op) in _arithOps:
+				op = _arithOps[type(node.op)]
+			else:
+				raise ValueError('operator not managed')
+			return '(%s %s %s)' % (visit(node.left, negated), op, 
+					visit(node.right, negated))
+		elif isinstance(node, ast.UnaryOp):
+			if isinstance(node.op, (ast.Not, ast.Invert)):
+				return (sql and '(NOT %s)' or '(~%s)') % \
+						visit(node.operand, not negated)
+			elif isinstance(node.op, ast.USub):
+				return '(-%s)' % visit(node.operand, negated)
+			raise ValueError('operator not managed')
+		elif isinstance(node, ast.Compare):
+			#chained comparisons are split into pairs
+			terms = []
+			left = node.left
+			for op, right in zip(node.ops, node.comparators):
+				if not type(op) in _cmpOps:
+					raise ValueError('operator not managed')
+				term = '(%s %s %s)' % (visit(left, negated), 
+						_cmpOps[type(op)][int(sql)], visit(right, negated))
+				nanValue = isinstance(op, ast.NotEq)
+				if sql and (nanValue != negated):
+					term = '(coalesce%s, %d))' % (term[:-1], nanValue)
+				terms.append(term)
+				left = right
+			if len(terms) == 1:
+				return terms[0]
+			return '(' + (sql and ' AND ' or ' & ').join(terms) + ')'
+		elif isinstance(node, ast.Name):
+			if node.id in colnames:
+				return node.id
+			elif node.id in condvars:
+				v = value(condvars[node.id])
+				if sql:
+					return v
+				params[node.id] = v
+				return node.id
+			raise ValueError('unknown name %s' % node.id)
+		elif isinstance(node, ast.Num):
+			return repr(node.n)
+		elif isinstance(node, ast.Str):
+			if sql:
+				return value(node.s)
+			return repr(node.s)
+		raise ValueError('expression not managed')
+
+	try:
+		tree = ast.parse(condition.strip(), mode='eval')
+		return visit(tree.body), params
+	except (SyntaxError, ValueError, TypeError):
+		return None
+
+def _zoneFilter(condition, zones, nzones, condvars=None):
+	""" 
+	-- Internal use --
+	Determine from per-chunk statistics (zone maps) which chunks of rows
+	may contain rows fulfilling a condition.
+	Only comparisons between a column and a constant combined with
+	logical and/or are used, any other part of the condition keeps all
+	the chunks.
+
+	inputs:
+		condition -- python condition string (e.g. '(x > 3) & (y < a)')
+		zones     -- dictionary {column: (mins, maxs, nnulls)} of the
+			     statistics of each chunk (min/max are None when the
+			     chunk has no valid values or no statistics)
+		nzones    -- number of chunks
+	keywords:
+		condvars  -- dictionary of external variables
+	outputs:
+		boolean array, False for chunks that cannot match
+	"""
+	condvars = condvars or {}
+	keepAll = numpy.ones(nzones, dtype=bool)
+
+	def const(node):
+		if isinstance(node, ast.Num):
+			return node.n
+		elif isinstance(node, ast.Str):
+			return node.s
+		elif isinstance(node, ast.Name) and (not node.id in zones) \
+				and (node.id in condvars) and numpy.isscalar(condvars[node.id]):
+			return condvars[node.id]
+		elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+			return -const(node.operand)
+		raise ValueError('not a constant')
+
+	def compare(name, op, val):
+		mins, maxs, nnulls = zones[name]
+		keep = numpy.ones(nzones, dtype=bool)
+		for i in range(nzones):
+			mn, mx = mins[i], maxs[i]
+			if (mn is None) or (mx is None):
+				#no valid values (or no statistics)
+				keep[i] = (op == ast.NotEq) or (nnulls[i] is None)
+			elif isinstance(mn, basestring) != isinstance(val, basestring):
+				keep[i] = True
+			elif op == ast.Lt:
+				keep[i] = mn < val
+			elif op == ast.LtE:
+				keep[i] = mn <= val
+			elif op == ast.Gt:
+				keep[i] = mx > val
+			elif op == ast.GtE:
+				keep[i] = mx >= val
+			elif op == ast.Eq:
+				keep[i] = (mn <= val) and (val <= mx)
+			elif op == ast.NotEq:
+				keep[i] = (mn != val) or (mx != val) or (nnulls[i] > 0)
+		return keep
+
+	flipped = { ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt,
+		    ast.GtE: ast.LtE, ast.Eq: ast.Eq, ast.NotEq: ast.NotEq }
+
+	def visit(node):
+		if isinstance(node, ast.BoolOp):
+			r = [ visit(k) for k in node.values ]
+			if isinstance(node.op, ast.And):
+				return reduce(numpy.logical_and, r)
+			return reduce(numpy.logical_or, r)
+		elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd):
+			return visit(node.left) & visit(node.right)
+		elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+			return visit(node.left) | visit(node.right)
+		elif isinstance(node, ast.Compare):
+			keep = keepAll.copy()
+			left = node.left
+			for op, right in zip(node.ops, node.comparators):
+				op = type(op)
+				try:
+					if isinstance(left, ast.Name) and (left.id in zones) and (op in flipped):
+						keep &= compare(left.id, op, const(right))
+					elif isinstance(right, ast.Name) and (right.id in zones) and (op in flipped):
+						keep &= compare(right.id, flipped[op], const(left))
+				except ValueError:
+					pass
+				left = right
+			return keep
+		return keepAll
+
+	try:
+		tree = ast.parse(condition.strip(), mode='eval')
+		return visit(tree.body)
+	except (SyntaxError, TypeError):
+		return keepAll
+
+#==============================================================================
+# Expression engine
+#==============================================================================
+#namespace of the expressions: math functions are replaced by their numpy
+#equivalent when available so that they apply to arrays
+_exprGlobals = {'numpy': numpy, 'nan': numpy.nan, 'inf': numpy.inf}
+for _k in dir(_math):
+	if _k[0] != '_':
+		_exprGlobals[_k] = getattr(numpy, _k, getattr(_math, _k))
+_exprGlobals.update({ 'asin': numpy.arcsin, 'acos': numpy.arccos, 
+		      'atan': numpy.arctan, 'atan2': numpy.arctan2,
+		      'asinh': numpy.arcsinh, 'acosh': numpy.arccosh,
+		      'atanh': numpy.arctanh, 'fabs': numpy.fabs,
+		      'abs': numpy.abs, 'pow': numpy.power, 
+		      'log10': numpy.log10, 'log1p': numpy.log1p })
+del _k
+
+_exprCache = {}
+_exprCacheSize = 1000
+_identifier = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+class TableExpression(object):
+	""" Compiled expression on table columns
+	The expression is parsed once: names are resolved from the syntax tree
+	(columns, external variables or math functions) and the expression is
+	compiled to a code object. Evaluation is done by blocks of rows to
+	limit the size of temporary arrays when the expression only involves
+	element-wise operations.
+
+	Use compileExpr to benefit from the cache of compiled expressions.
+	"""
+	def __init__(self, expr, aliases=()):
+		""" constructor
+		inputs:
+			expr    -- expression string (python syntax)
+		keywords:
+			aliases -- column names that are not valid python
+				   identifiers and that appear in expr.
+		"""
+		self.expr = expr
+		self.aliases = {}
+		_expr = expr
+		if len(aliases) > 0:
+			#whole names only (not inside a longer name), longest first
+			aliases = sorted(aliases, key=len, reverse=True)
+			names = dict([ (name, '__col%d__' % k) for k, name in enumerate(aliases) ])
+			pattern = re.compile(r'(?<!\w)(%s)(?!\w)' % \
+					'|'.join([ re.escape(k) for k in aliases ]))
+			_expr = pattern.sub(lambda m: names[m.group(1)], expr)
+			self.aliases = dict([ (v, k) for k, v in names.iteritems() ])
+		self.tree = ast.parse(_expr.strip(), mode='eval')
+		self.code = compile(self.tree, '<expr: %s>' % expr, 'eval')
+		self.names = []
+		self.elementwise = True
+		for node in ast.walk(self.tree):
+			if isinstance(node, ast.Name):
+				name = self.aliases.get(node.id, node.id)
+				if not name in self.names:
+					self.names.append(name)
+			elif isinstance(node, ast.Call):
+				func = getattr(node.func, 'id', None)
+				if not isinstance(_exprGlobals.get(func, None), numpy.ufunc):
+					self.elementwise = False
+			elif isinstance(node, (ast.Attribute, ast.Subscript, 
+					ast.Lambda, ast.ListComp, ast.GeneratorExp)):
+				self.elementwise = False
+
+	def __repr__(self):
+		return 'TableExpression: %s' % self.expr
+
+	def _namespace(self, columns, exprvars, i0=None, i1=None):
+		""" -- Internal use --
+		local variables of the evaluation (rows i0:i1 of the columns) """
+		local = {}
+		for name in self.names:
+			alias = name
+			for k, v in self.aliases.iteritems():
+				if v == name:
+					alias = k
+			if name in columns:
+				if i0 == None:
+					local[alias] = columns[name]
+				else:
+					local[alias] = columns[name][i0:i1]
+			elif name in exprvars:
+				local[alias] = exprvars[name]
+		return local
+
+	def evaluate(self, columns, nrows, exprvars=None, blocksize=65536):
+		""" evaluate the expression
+		inputs:
+			columns  -- dictionary of the column arrays (only the
+				    columns used in the expression are accessed)
+			nrows    -- number of rows of the columns
+		keywords:
+			exprvars -- dictionary of external variables
+			blocksize-- number of rows evaluated at once
+		"""
+		exprvars = exprvars or {}
+		usedcols = [ k for k in self.names if k in columns ]
+		blocked = self.elementwise & (len(usedcols) > 0) & (nrows > blocksize)
+		if blocked:
+			for k in self.names:
+				if (not k in columns) and (k in exprvars) \
+					and (not numpy.isscalar(exprvars[k])):
+					blocked = False
+		cols = dict([ (k, numpy.asarray(columns[k])) for k in usedcols ])
+		if not blocked:
+			return eval(self.code, _exprGlobals, self._namespace(cols, exprvars))
+		out = None
+		for i0 in range(0, nrows, blocksize):
+			i1 = min(i0 + blocksize, nrows)
+			r = eval(self.code, _exprGlobals, self._namespace(cols, exprvars, i0, i1))
+			if out is None:
+				if numpy.ndim(r) == 0 or numpy.shape(r)[0] != i1 - i0:
+					#not a row-wise result
+					return eval(self.code, _exprGlobals, self._namespace(cols, exprvars))
+				r = numpy.asarray(r)
+				out = numpy.empty((nrows,) + r.shape[1:], dtype=r.dtype)
+			out[i0:i1] = r
+		return out
+
+def compileExpr(expr, colnames=()):
+	""" Returns the compiled TableExpression associated to expr
+	Compiled expressions are cached per expression string.
+	inputs:
+		expr     -- expression string
+	keywords:
+		colnames -- column names (only used to detect names that are not
+			    valid python identifiers)
+	"""
+	aliases = [ k for k in colnames if (k in expr) and (not _identifier.match(k)) ]
+	aliases = tuple(sorted(aliases, key=len, reverse=True))
+	key = (expr, aliases)
+	if not key in _exprCache:
+		if len(_exprCache) >= _exprCacheSize:
+			_exprCache.clear()
+		_exprCache[key] = TableExpression(expr, aliases)
+	return _exprCache[key]
+
+
+#==============================================================================
+# Statistics
+#==============================================================================
+
+def _columnStats(a, val=['mean', 'min', 'max', 'std', 'q', 'n', 'hpd'],
+		qlist=[2.5, 25, 50, 75, 97.5], alpha=0.05, blocksize=65536):
+	""" 
+	-- Internal use --
+	Returns the statistics of one column as a dictionary
+	The column is sorted at most once: quantiles and hpd interval are
+	derived from the same sorted copy. Moments, min and max are computed
+	in one pass by blocks of rows (shifted sums to limit round-off errors).
+	Boolean columns are counted as 0/1 values (the mean is the fraction
+	of True). Non-numerical columns give NaN values.
+
+	inputs:
+		a     -- column data
+	keywords:
+		val   -- statistics to compute (see Table.stats)
+		qlist -- quantiles to compute (in %)
+		alpha -- hpd interval contains 1 - alpha of the sample
+	"""
+	a = numpy.asarray(a)
+	if a.ndim > 1:
+		a = a.ravel()
+	n = len(a)
+	r = { 'n': n, 'mean': numpy.nan, 'min': numpy.nan, 'max': numpy.nan,
+	      'std': numpy.nan, 'q': [numpy.nan] * len(qlist), 
+	      'hpd': [numpy.nan] * 2 }
+	if (n == 0) or (not a.dtype.kind in 'biuf'):
+		return r
+	if a.dtype.kind == 'b':
+		#booleans cannot be subtracted (hpd widths)
+		a = a.view(numpy.int8)
+
+	if ('q' in val) or ('hpd' in val):
+		sx = numpy.sort(a)
+		if 'q' in val:
+			ind = [ int(n * q / 100.) for q in qlist ]
+			r['q'] = [ sx[k] if k < n else numpy.nan for k in ind ]
+		if 'hpd' in val:
+			k = int(n * (1 - alpha))
+			if k < n:
+				widths = sx[k:] - sx[:n - k]
+				if widths.dtype.kind == 'f':
+					widths[numpy.isnan(widths)] = numpy.inf
+				i = widths.argmin()
+				r['hpd'] = [sx[i], sx[i + k]]
+		del sx
+
+	if ('mean' in val) or ('std' in val) or ('min' in val) or ('max' in val):
+		shift = float(a[0])
+		s1 = s2 = 0.
+		mins, maxs = [], []
+		for i0 in range(0, n, blocksize):
+			b = a[i0:i0 + blocksize]
+			mins.append(b.min())
+			maxs.append(b.max())
+			b = b.astype(float) - shift
+			s1 += b.sum()
+			s2 += numpy.dot(b, b)
+		r['min'] = numpy.min(mins)
+		r['max'] = numpy.max(maxs)
+		r['mean'] = shift + s1 / n
+		r['std'] = numpy.sqrt(max(s2 / n - (s1 / n) ** 2, 0.))
+	return r
+
+
 #==============================================================================
 class Table(object): 
 	""" This class implements a Table object which aims at being able to
@@ -301,6 +902,13 @@ class Table(object):
 
 		"""
 		self.source = None
+		self.sourceTable = None
+		self.sourceManager = None
+		self._sourceCols = set()
+		self._indexes = {}
+		self._rowBuffers = {}
+		self._versions = {}
+		self.virtual = {}
 		self.nrows = 0
 		self.ncols = 0
 		#Table header
@@ -308,7 +916,7 @@ class Table(object):
 		if name != None:
 			self.setName(name)
 		#Gen Columns
-		self.data = {}
+		self.data = TableColumnDict()
 		if iterable != None:
 			assert(_isiterable(iterable))
 			if isinstance(iterable, dict):
@@ -386,14 +994,14 @@ class Table(object):
 		name = name or 'None'
 		if len(self.data) > 0:
 			shape = numpy.shape(array)
-			sshape = self.data[self.data.keys()[0]].shape
+			sshape = self._peekCol(self.data.keys()[0]).shape
 			if shape[0] != sshape[0]:
 				raise Exception("Column size mismatch, expecting %i rows, found %i" \
 						% (sshape[0], shape[0]) )
 		else:
 			if numpy.size(numpy.shape(array)) > 0: 
 				self.nrows = numpy.shape(array)[0]
-		if isinstance(array, TableColumn):
+		if isinstance(array, (TableColumn, TableColumnProxy)):
 			if name == 'None':
 				name = array.header.name
 			
@@ -401,6 +1009,102 @@ class Table(object):
 			self.data[name] = array
 		else:
 			self.data[name] = TableColumn(array, name=name, **kwargs)
+		self._sourceChanged(name)
+
+	def appendRows(self, rows):
+		""" Append rows to the table
+		Columns are stored into buffers whose capacity doubles when full,
+		so that appending rows (even one by one) is O(1) amortized.
+		Column headers of appended tables are checked (see vstack).
+			inputs:
+				rows -- [ Table | dict | record array | list of tuples ]
+					rows to append: table or dictionary of
+					columns (or values of one row), records or
+					tuples of values in the order of the sorted
+					column names (as written in text files)
+		"""
+		hdrs = {}
+		if isinstance(rows, Table):
+			hdrs = dict([ (k, rows.getColHeader(k)) for k in rows.keys() ])
+			rows = dict([ (k, numpy.asarray(rows[k])) for k in rows.keys() ])
+		elif isinstance(rows, dict):
+			rows = dict([ (k, numpy.asarray(v)) for k, v in rows.iteritems() ])
+		elif getattr(getattr(rows, 'dtype', None), 'names', None):
+			rec = numpy.atleast_1d(rows)
+			rows = dict([ (k, rec[k]) for k in rec.dtype.names ])
+		else:
+			if isinstance(rows, tuple):
+				rows = [rows]
+			cols = zip(*rows)
+			keys = sorted(self.keys())
+			if len(cols) != len(keys):
+				raise Exception("Expecting rows of %d values (%s)" % (len(keys), ', '.join(keys)))
+			rows = dict([ (k, numpy.asarray(c)) for k, c in zip(keys, cols) ])
+		if (len(self.data) > 0) and (sorted(rows.keys()) != sorted(self.keys())):
+			raise Exception("Expecting columns %s, found %s" % (self.keys(), rows.keys()))
+		for k in rows:
+			#values of a single row
+			ndim = 1
+			if k in self.data:
+				ndim = len(self._peekCol(k).shape)
+			if rows[k].ndim < ndim:
+				rows[k] = rows[k][numpy.newaxis]
+		if len(rows) == 0:
+			return
+		n = self.nrows
+		m = len(rows.values()[0])
+		for k, v in rows.iteritems():
+			if len(v) != m:
+				raise Exception("Column %s has %d rows, expecting %d" % (k, len(v), m))
+			col = None
+			if k in self.data:
+				col = self._peekCol(k)
+				hdr = col.header
+				if k in hdrs:
+					ref = numpy.zeros((0,) + col.shape[1:], dtype=col.dtype).view(TableColumn)
+					ref.header = hdr
+					new = v[:0].view(TableColumn)
+					new.header = hdrs[k]
+					_checkColumn(ref, new, k)
+				dtype = numpy.result_type(col.dtype, v.dtype)
+			else:
+				if k in hdrs:
+					#the header of the appended table is not shared
+					hdr = hdrs[k].copy()
+				else:
+					hdr = TableColumnHeader(k, v.dtype)
+				dtype = v.dtype
+			buf, bufcol = self._rowBuffers.get(k, (None, None))
+			if (buf is None) or (bufcol is not col) or (buf.dtype != dtype) \
+					or (len(buf) < n + m):
+				#new buffer at least twice larger than the data
+				capacity = max(2 * (n + m), 16)
+				buf = numpy.empty((capacity,) + v.shape[1:], dtype=dtype)
+				if col is not None:
+					buf[:n] = numpy.asarray(self.data[k])
+			buf[n:n + m] = v
+			col = buf[:n + m].view(TableColumn)
+			col.header = hdr
+			if hdr.dtype != dtype:
+				hdr['dtype'] = dtype
+			self.data[k] = col
+			self._rowBuffers[k] = (buf, col)
+			self._sourceChanged(k)
+		self.nrows = n + m
+		self.ncols = len(self.data)
+
+	def _sourceChanged(self, name):
+		""" -- Internal use --
+		The column does not correspond to the source anymore, conditions
+		on it cannot be evaluated by the source (see where) and its index
+		is not valid anymore """
+		if hasattr(self, '_sourceCols'):
+			self._sourceCols.discard(name)
+		if hasattr(self, '_indexes'):
+			self.removeIndex(name)
+		if hasattr(self, '_versions'):
+			#virtual columns using this column must be computed again
+			self._versions[name] = self._versions.get(name, 0) + 1
 
 	def delCol(self, name):
 		""" Delete Table column 
@@ -408,7 +1112,12 @@ class Table(object):
 				name -- [ string ]
 					Column to delete
 		"""
+		if (name in self.virtual) and (not name in self.data):
+			self.virtual.pop(name)
+			self._sourceChanged(name)
+			return
 		cCol = self.data.pop(name)
+		self._sourceChanged(name)
 		del cCol
 	
 	def pop(self, name):
@@ -419,63 +1128,307 @@ class Table(object):
 			outputs:
 				poped column
 		"""
+		self._sourceChanged(name)
 		return self.data.pop(name)
 
-	def evalexpr(self, expr, exprvars=None, start=None, stop=None, step=None):
+	def evalexpr(self, expr, exprvars=None, start=None, stop=None, step=None, blocksize=65536):
 		""" evaluate expression based on the data and external variables
 		    all numpy.math expression can be used (log, exp, pi...)
+		    The expression is compiled once (see compileExpr) and
+		    evaluated by blocks of rows when possible.
+			inputs:
+				expr     -- expression string, e.g. 'log10(x/y) + a'
+			keywords:
+				exprvars -- dictionary of external variables
+				start, stop, step -- only evaluate this row range
+				blocksize-- number of rows evaluated at once
 		"""
-		_expr = expr
-		keys = numpy.asarray(self.keys())
-		lenkeys = numpy.asarray([ len(k) for k in keys ])
-		keys = keys[ numpy.argsort(lenkeys)[::-1] ]
-		for k in keys:
-			_expr = _expr.replace(k, 'self.data["%s"]'%k)
 		if exprvars != None:
 			assert(isinstance(exprvars,dict)),"Expecting dictionary as condvars"
-			for k in exprvars.keys():
-				_expr = _expr.replace(k, 'exprvars["%s"]'%k)
-		return eval(_expr)
+		plan = compileExpr(expr, self._colNames())
+		rows = slice(start, stop, step)
+		if (len(plan.names) == 1) and (plan.names[0] in self._colNames()) \
+				and (plan.expr.strip() == plan.names[0]):
+			#expression is a column
+			if (start == None) & (stop == None) & (step == None):
+				return self.getCol(plan.names[0])
+			return numpy.asarray(self.getCol(plan.names[0]))[rows]
+		columns = self._exprColumns(plan.names, rows)
+		nrows = len(xrange(*rows.indices(self.nrows)))
+		return plan.evaluate(columns, nrows, exprvars, blocksize=blocksize)
 
 	def extract(self, ind=None, fields=None):
 		""" Generates a subtable containing lines defined by ind and
 		fields. If fields is not provided, then the full set is
-		retrieved. Header is copied into the new table. """
-		if fields == None:
+		retrieved. 
+		Column headers are copied (TableColumnHeader.shared). Without
+		ind or with a slice, the columns are views on the data of this
+		table (no copy): modifying the values of one table also
+		modifies the other one.
+		"""
+		if fields is None:
 			fields = self.keys()
-		if ind == None:
-			ind = range(self.nrows)
-
-		hdrs =[ TableColumn(self.getCol(k)).header         \
-			for k in numpy.asarray(fields) if
-			getattr(TableColumn(self.getCol(k)), 'header', False) ]
- 
-		data = [ TableColumn(self.getCol(k)[ind],          \
-				name=self.getCol(k).header['name'],\
-				unit=self.getCol(k).header['unit'],\
-				description = self.getCol(k).header['description'],\
-				dtype = self.getCol(k).header['dtype'], \
-				null = self.getCol(k).header['null'],   \
-				format=self.getCol(k).header['format']	)\
-			for k in numpy.asarray(fields)                ]
-		return Table(data, name=self.header['NAME']+'_extract')
-
-	def selectWhere(self, condition, condvars=None, fields=None, start=None, stop=None, step=None):
+		tab = Table(header=self.header, name=self.header['NAME']+'_extract')
+		for k in fields:
+			tab.addCol(self._colView(k, ind), name=k)
+		return tab
+
+	def selectWhere(self, condition, condvars=None, fields=None, start=None, stop=None, step=None, view=False):
 		""" Read table data fulfilling the given `condition`.
 			Only the rows fulfilling the `condition` are included in the result.
+			Simple conditions on file-backed tables (hdf5, sqlite)
+			are evaluated by the source and only the matching rows
+			are read.
+			If view is set, returns a TableView: the columns are only
+			gathered when they are read.
 		"""
+		if view:
+			ind = self.where(condition, condvars, start=start, stop=stop, step=step)
+			return self.view(ind, fields=fields)
+		data = self._sourceQuery('readWhere', condition, condvars, 
+				fields=fields, start=start, stop=stop, step=step)
+		if data is not None:
+			return Table(data, header=self.header, name=self.header['NAME']+'_extract')
 		ind = self.where(condition, condvars, start=start, stop=stop, step=step)
 		return self.extract(ind, fields=fields)
 
+	def view(self, ind=None, fields=None):
+		""" Returns a lazy selection of lines and fields (TableView)
+		Column data are only gathered when read.
+			inputs:
+				ind    -- slice, boolean mask or indices of the rows
+				fields -- columns to keep
+		"""
+		return TableView(self, ind, fields=fields)
+
+	def groupby(self, keys):
+		""" Returns the groups of rows sharing the same values of the
+		key column(s) (TableGroupBy). Use its agg method to compute
+		statistics per group:
+			> t.groupby(['field', 'chip']).agg({'mag': ['mean', 'std'], 'x': 'count'})
+			inputs:
+				keys -- column name or list of column names
+		"""
+		return TableGroupBy(self, keys)
+
 	def where(self, condition, condvars=None, start=None, stop=None, step=None):
 		""" Read table data fulfilling the given `condition`.
 			Only the rows fulfilling the `condition` are included in the result.
+			Simple conditions on file-backed tables (hdf5, sqlite)
+			are evaluated by the source (in-kernel/SQL queries)
 		"""
+		ind = self._sourceQuery('getWhereList', condition, condvars, 
+				start=start, stop=stop, step=step)
+		if ind is not None:
+			return (ind,)
+		if (start == None) & (stop == None) & (step == None):
+			ind = self._indexQuery(condition, condvars)
+			if ind is not None:
+				return (ind,)
 		ind = numpy.where(self.evalexpr(condition, condvars, start=start, stop=stop, step=step ))
+		if (start != None) | (stop != None) | (step != None):
+			#indices of the full table
+			i0, i1, di = slice(start, stop, step).indices(self.nrows)
+			ind = tuple([ i0 + k * di for k in ind ])
 		return ind
+
+	def createIndex(self, name, persist=True):
+		""" Creates a sorted index on a column
+		where/selectWhere use the indexes for comparisons between indexed
+		columns and constants (binary searches instead of full scans).
+		The indexed column is replaced by a private copy that is
+		read-only while indexed (use removeIndex before modifying its
+		values in place): views taken before (extract, slices, TableView)
+		do not share its data anymore and views taken after are
+		read-only. The index is dropped when the column is replaced
+		(t[name] = ..., addCol), deleted (delCol, pop), when rows are
+		appended (appendRows) or by removeIndex.
+			inputs:
+				name    -- column name
+			keywords:
+				persist -- also store the index with the source file of
+					   the table when the format manages it 
+					   (npyd, hdf5)
+		"""
+		self.removeIndex(name)
+		col = self.getCol(name)
+		private = numpy.array(col).view(TableColumn)
+		private.header = col.header
+		self.data[name] = private
+		index = TableColumnIndex(private)
+		self._indexes[name] = index
+		if persist and (name in self._sourceCols):
+			self._sourceQuery('createIndex', name, index)
+		return index
+
+	def removeIndex(self, name):
+		""" Removes the index of a column (the column is modifiable
+		again) """
+		index = self._indexes.pop(name, None)
+		if index is not None:
+			index.release()
+
+	def _getIndex(self, name):
+		""" -- Internal use --
+		Returns the valid index of a column or None """
+		index = self._indexes.get(name, None)
+		if index is None:
+			return None
+		if (not name in self.data) or (not index.isvalid(self._peekCol(name))):
+			self.removeIndex(name)
+			return None
+		return index
+
+	def _indexQuery(self, condition, condvars=None):
+		""" -- Internal use --
+		Evaluates the condition using the column indexes
+		Comparisons between indexed columns and constants combined with
+		logical and/or are solved by binary searches. When the indexes
+		only give candidate rows (other terms, several columns), the
+		condition is evaluated on these candidate rows only.
+		Returns the sorted indices of the matching rows or None if the
+		indexes cannot be used.
+		"""
+		if len(self._indexes) == 0:
+			return None
+		condvars = condvars or {}
+		indexes = dict([ (k, self._getIndex(k)) for k in self._indexes.keys() ])
+
+		def const(node):
+			if isinstance(node, ast.Num):
+				return node.n
+			elif isinstance(node, ast.Str):
+				return node.s
+			elif isinstance(node, ast.Name) and (not node.id in self.data) \
+					and (node.id in condvars) and numpy.isscalar(condvars[node.id]):
+				return condvars[node.id]
+			elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+				return -const(node.operand)
+			raise ValueError('not a constant')
+
+		flipped = { ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt,
+			    ast.GtE: ast.LtE, ast.Eq: ast.Eq, ast.NotEq: ast.NotEq }
+
+		def compare(left, op, right):
+			""" returns (column, ranges of the sorted index) """
+			if isinstance(left, ast.Name) and (indexes.get(left.id, None) is not None):
+				return left.id, indexes[left.id].ranges(op, const(right))
+			elif isinstance(right, ast.Name) and (indexes.get(right.id, None) is not None):
+				return right.id, indexes[right.id].ranges(flipped[op], const(left))
+			raise ValueError('not indexed')
+
+		def merge(terms, other):
+			""" conjunction of {column: ranges} (None: list of rows) """
+			for k, v in other.iteritems():
+				if not k in terms:
+					terms[k] = v
+				elif k is None:
+					terms[k] = numpy.intersect1d(terms[k], v, assume_unique=True)
+				else:
+					terms[k] = _intersectRanges(terms[k], v)
+			return terms
+
+		def materialize(terms):
+			""" returns the smallest set of candidate rows """
+			best = None
+			for k, v in terms.iteritems():
+				if k is None:
+					rows = v
+				else:
+					rows = indexes[k].rows(v)
+				if (best is None) or (len(rows) < len(best)):
+					best = rows
+			return best
+
+		def visit(node):
+			""" returns ({column: ranges}, exact) or None """
+			if isinstance(node, ast.Compare):
+				terms = {}
+				left = node.left
+				for op, right in zip(node.ops, node.comparators):
+					if not type(op) in flipped:
+						return None
+					try:
+						k, r = compare(left, type(op), right)
+					except ValueError:
+						return None
+					merge(terms, {k: r})
+					left = right
+				return terms, True
+			isAnd = (isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And)) or \
+				(isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitAnd))
+			isOr = (isinstance(node, ast.BoolOp) and isinstance(node.op, ast.Or)) or \
+				(isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr))
+			if not (isAnd or isOr):
+				return None
+			if isinstance(node, ast.BoolOp):
+				r = [ visit(k) for k in node.values ]
+			else:
+				r = [ visit(node.left), visit(node.right) ]
+			if isOr:
+				if None in r:
+					return None
+				mask = numpy.zeros(self.nrows, dtype=bool)
+				for terms, exact in r:
+					mask[materialize(terms)] = True
+				exact = numpy.all([ (k[1] and (len(k[0]) == 1)) for k in r ])
+				return {None: numpy.where(mask)[0]}, exact
+			found = [ k for k in r if k is not None ]
+			if len(found) == 0:
+				return None
+			terms = {}
+			for k in found:
+				merge(terms, k[0])
+			return terms, (len(found) == len(r)) and numpy.all([ k[1] for k in found ])
+
+		try:
+			r = visit(ast.parse(condition.strip(), mode='eval').body)
+		except (SyntaxError, TypeError):
+			return None
+		if r is None:
+			return None
+		terms, exact = r
+		rows = materialize(terms)
+		if len(rows) > self.nrows / 16:
+			mask = numpy.zeros(self.nrows, dtype=bool)
+			mask[rows] = True
+			rows = numpy.where(mask)[0]
+		else:
+			rows = numpy.sort(rows)
+		if (not exact) or (len(terms) > 1):
+			#remaining terms are evaluated on the candidate rows only
+			expr = compileExpr(condition, self._colNames())
+			cols = self._exprColumns(expr.names, rows)
+			mask = numpy.asarray(expr.evaluate(cols, len(rows), condvars), dtype=bool)
+			if mask.ndim == 0:
+				mask = numpy.repeat(mask, len(rows))
+			rows = rows[mask]
+		return rows
+
+	def _sourceQuery(self, method, *args, **kwargs):
+		""" -- Internal use --
+		Delegate a query to the manager of the table source (predicate
+		pushdown). Returns None if the source cannot evaluate it.
+		"""
+		manager = getattr(self, 'sourceManager', None)
+		if (manager is None) or (getattr(self, 'sourceTable', None) is None):
+			return None
+		return getattr(manager, method)(self, *args, **kwargs)
 			
 
 
+	def _colView(self, name, ind=None):
+		""" -- Internal use --
+		Returns column rows selected by ind as a new TableColumn sharing
+		a copy of the header and, for slices, the data buffer """
+		col = self.getCol(name)
+		data = numpy.asarray(col)
+		if ind is not None:
+			data = data[ind]
+		view = data.view(TableColumn)
+		view.header = col.header.shared()
+		return view
+
 	def getCol(self, name):
 		""" Returns one/multiple Column(s)
 			inputs:
@@ -483,10 +1436,104 @@ class Table(object):
 					name of the columns to extract
 		"""
 		if _isiterable(name):
-			return [ self.data[k] for k in name ]
+			return [ self.getCol(k) for k in name ]
+		elif (name in self.virtual) and (not name in self.data):
+			return self._getVirtual(name)
 		else:
 			return self.data[name]	
 
+	def _colNames(self):
+		""" -- Internal use --
+		Returns the names of the stored and virtual columns """
+		return self.keys() + [ k for k in self.virtual if not k in self.data ]
+
+	def _exprColumns(self, names, rows=slice(None)):
+		""" -- Internal use --
+		Returns the rows of the named columns (stored or virtual) used
+		by an expression as a dictionary of arrays """
+		columns = {}
+		for k in names:
+			if (k in self.data) or (k in self.virtual):
+				columns[k] = numpy.asarray(self.getCol(k))[rows]
+		return columns
+
+	def addVirtualCol(self, expr, name=None, unit=None, description=None, 
+			format=None, exprvars=None):
+		""" Adds a column defined by an expression of the other columns
+		The values are computed when the column is read (getCol,
+		expressions, where...) and kept until one of the columns used by
+		the expression is replaced or deleted (addCol, appendRows,
+		delCol...), in-place modifications of the values are not
+		detected. Virtual columns are not written unless requested (see
+		write) and are listed in t.virtual.
+			inputs:
+				expr -- expression (see evalexpr), e.g. 'B - V'
+			keywords:
+				name     -- name of the column (def: expr)
+				unit, description, format -- column header
+				exprvars -- dictionary of external variables
+		"""
+		name = name or expr
+		if name in self.data:
+			raise Exception("Column %s already exists" % name)
+		if exprvars != None:
+			assert(isinstance(exprvars,dict)),"Expecting dictionary as exprvars"
+		#the name of the column itself (e.g. the expression) is not an alias
+		colnames = [ k for k in self._colNames() if k != name ]
+		plan = compileExpr(expr, colnames)
+		depends = [ k for k in plan.names if k in colnames ]
+		header = TableColumnHeader(name, None, unit, description, None, format)
+		self.virtual[name] = TableVirtualColumn(expr, depends, header, exprvars, colnames)
+		self._sourceChanged(name)
+		return self.virtual[name]
+
+	def _virtualKey(self, name):
+		""" -- Internal use --
+		Returns the versions of the columns used by a virtual column """
+		key = [ self._versions.get(name, 0) ]
+		for k in self.virtual[name].depends:
+			if (k in self.virtual) and (not k in self.data):
+				key.append( (k, self._virtualKey(k)) )
+			else:
+				key.append( (k, self._versions.get(k, 0)) )
+		return tuple(key)
+
+	def _getVirtual(self, name):
+		""" -- Internal use --
+		Returns the values of a virtual column, computed if needed """
+		vcol = self.virtual[name]
+		key = self._virtualKey(name)
+		if not vcol.isvalid(key):
+			vcol.clear()
+			value = numpy.asarray(vcol.plan.evaluate(self._exprColumns(vcol.depends),
+						self.nrows, vcol.exprvars))
+			if value.ndim == 0:
+				value = numpy.repeat(value, self.nrows)
+			col = value.view(TableColumn)
+			vcol.header.__dict__['dtype'] = col.dtype
+			col.header = vcol.header
+			vcol.value, vcol.key = col, key
+		return vcol.value
+
+	def _peekCol(self, name):
+		""" -- Internal use --
+		Returns the stored column without reading it if not loaded yet
+		(TableColumnProxy of lazy tables) """
+		if (name in self.virtual) and (not name in self.data):
+			return self.virtual[name]
+		if hasattr(self.data, 'peek'):
+			return self.data.peek(name)
+		return self.data[name]
+
+	def getColHeader(self, name):
+		""" Returns the header of a given column
+		    (without reading the data of lazy columns)
+			inputs:
+				name -- [ string ]
+					name of the column
+		"""
+		return self._peekCol(name).header
+
 	def getRow(self, idx, fields=None):
 		""" Returns one/multiple row(s)
 			inputs:
@@ -509,7 +1556,8 @@ class Table(object):
 			return row
 
 	def __getslice__(self, i,j):
-		return self.getRow(numpy.arange(i,j))
+		""" Returns a subtable whose columns are views on this table """
+		return self.extract(slice(i,j))
 
 	def __iter__(self):
 		return self.data.__iter__()
@@ -604,15 +1652,21 @@ class Table(object):
 			print "Table linked to source file"
 		keys = numpy.sort(self.keys())
 		for k in keys:
-			print self[k].__repr__().split('Table')[0][:-1].replace(',', '')
+			hdr = self.getColHeader(k)
+			txt = "Column: %s" % hdr.name
+			if hdr.unit != None:
+				txt += ' \tunit=%s' % hdr.unit
+			if hdr.description != None:
+				txt += ' \t(%s)' % hdr.description
+			print txt.replace(',', '')
 	
 	def setUnit(self, colName, unit):
 		""" Set the unit of a column referenced by its name """
-		self.data[colName].header['unit'] = unit
+		self.getColHeader(colName)['unit'] = unit
 
 	def setComment(self, colName, comment):
 		""" Set the comment of a column referenced by its name """
-		self.data[colName].header['description'] = comment
+		self.getColHeader(colName)['description'] = comment
 
 	def setName(self, name):
 		""" Set Table name """
@@ -624,7 +1678,7 @@ class Table(object):
 	def has_key(self, k):
 		return self.data.has_key(k)
 
-	def read(self, filename, type=None, manager=None, silent=False, **kwargs):
+	def read(self, filename, type=None, manager=None, silent=False, cache=None, **kwargs):
 		""" This function is a general function aiming at reading files
 		it uses the registered extensions to use the appropriate reading
 		function.
@@ -639,6 +1693,10 @@ class Table(object):
 			manager  -- [ TableManager ]
 				    If specified, it will use this format
 				    manager (even if not registered)
+			cache    -- [ bool ]
+				    use the parse cache of text tables 
+				    (see enableCache), def: True once the
+				    cache is enabled.
 
 			**kwargs are sent to the TableManager.read function
 		"""
@@ -647,7 +1705,25 @@ class Table(object):
 				manager = _determine_type(_extensions, filename, verbose=not silent)
 			else:
 				manager = _determine_type(_extensions, type, verbose=False)
-		data, description = manager.read( filename, **kwargs)
+		if cache is None:
+			cache = _parseCache['directory'] is not None
+		if cache and getattr(manager, 'cacheable', False):
+			if _parseCache['directory'] is None:
+				enableCache()
+			cached = _cacheRead(filename, manager, kwargs)
+			if cached is None:
+				data, description = manager.read( filename, **kwargs)
+				_cacheWrite(filename, manager, kwargs, data, description)
+			else:
+				data, description = cached
+		else:
+			data, description = manager.read( filename, **kwargs)
+		self._fill(data, description, filename, manager=manager)
+
+	def _fill(self, data, description, filename=None, manager=None):
+		""" -- Internal use --
+		Fill the table from the (data, description) pair returned by a
+		TableManager """
 		if isinstance(data, dict): 
 			for k in data: self.addCol(data[k], name=k )
 		else:
@@ -655,10 +1731,20 @@ class Table(object):
 			for k in data: self.addCol(k)
 		if '_sourceFile' in description:
 			self.source = description.pop('_sourceFile')
+		if '_sourceTable' in description:
+			self.sourceTable = description.pop('_sourceTable')
+			self.sourceManager = manager
+			self._sourceCols = set(self.keys())
+		if '_indexes' in description:
+			#indexes stored with the source
+			for k, order in description.pop('_indexes').iteritems():
+				if k in self.data:
+					self._indexes[k] = TableColumnIndex(self.getCol(k), order)
 		self.header = description
-		self.header['SOURCE'] = os.path.realpath(filename)
+		if filename != None:
+			self.header['SOURCE'] = os.path.realpath(filename)
 
-	def write(self, filename, type=None, manager=None, silent=False, **kwargs):
+	def write(self, filename, type=None, manager=None, silent=False, virtual=False, **kwargs):
 		""" This function is a general function aiming at writing files
 		it uses the registered extensions to use the appropriate writing
 		function.
@@ -677,6 +1763,10 @@ class Table(object):
 				    If specified, it will use this format
 				    manager (even if not registered)
 
+			virtual  -- [ bool | list ]
+				    also write the virtual columns (True) or
+				    the given virtual columns (names)
+
 			**kwargs are sent to the TableManager.write function
 		"""
 		if manager == None:
@@ -684,200 +1774,617 @@ class Table(object):
 				manager = _determine_type(_extensions, filename, verbose=not silent)
 			else:
 				manager = _determine_type(_extensions, type, verbose=not silent)
-		comments = [self[k].header['description'] for k in self]
-		units    = [self[k].header['unit'] for k in self]
-		return manager.write(self.data, header=self.header,
+		data = self.data
+		if virtual:
+			if virtual is True:
+				virtual = self.virtual.keys()
+			data = TableColumnDict()
+			for k in self.data:
+				dict.__setitem__(data, k, self._peekCol(k))
+			for k in virtual:
+				data[k] = self.getCol(k)
+		comments = [data[k].header['description'] for k in data]
+		units    = [data[k].header['unit'] for k in data]
+		return manager.write(data, header=self.header,
 					output=filename, comments=comments, 
 					units=units, silent=silent, **kwargs) 
-	try:
-		def stats(self, fields=None, val=['mean', 'min', 'max', 'std', 'q', 'n', 'hpd']):	
-			"""returns a table with statistics over the selected columns (mean, std, hpd, quantiles...)
-				inputs: 
-					fields  -- selected columns to use
-					val     -- list of statistics to return
-							(see list below)
+	def stats(self, fields=None, val=['mean', 'min', 'max', 'std', 'q', 'n', 'hpd'],
+			qlist=[2.5, 25, 50, 75, 97.5], alpha=0.05, threads=None):	
+		"""returns a table with statistics over the selected columns (mean, std, hpd, quantiles...)
+		Each column is sorted at most once (quantiles and hpd are derived
+		from the same sorted copy), moments are computed in a single pass
+		and columns are processed in parallel threads.
+			inputs: 
+				fields  -- selected columns to use
+				val     -- list of statistics to return
+						(see list below)
+			keywords:
+				qlist   -- quantiles to compute (in %)
+				alpha   -- hpd interval contains 1 - alpha of the sample
+				threads -- number of threads (def: number of cpus)
+		
+			output:
+				table object containing the corresponding statistics (one line per field)
+
+			Available statistics:
 			
-				output:
-					table object containing the corresponding statistics (one line per field)
+				hpd   -- highest probable density at 95%
+				mean  -- mean value
+				min   -- minimal value
+				max   -- maximal value
+				n     -- sample length
+				q     -- quantiles: 2.5, 25, 50, 75, 97.5
+				std   -- standard deviation
+		"""
+		if fields==None:
+			fields= self.keys()
+		r = _threadMap(lambda k: _columnStats(self[k], val, qlist, alpha), 
+				fields, threads)
+
+		s = Table(name='%s, Statistics' % self.header['NAME'])
+
+		s.addCol(fields, name='Field')
+		if 'n' in val:
+			s.addCol(numpy.array([ rk['n'] for rk in r ]), name='n',  description='sample length')
+		if 'mean' in val:
+			s.addCol(numpy.array([ rk['mean'] for rk in r ]), name='mean',  description='mean value')
+		if 'min' in val:
+			s.addCol(numpy.array([ rk['min'] for rk in r ]), name='min',  description='minimum value')
+		if 'max' in val:
+			s.addCol(numpy.array([ rk['max'] for rk in r ]), name='max',  description='maximum value')
+		if 'std' in val:
+			s.addCol(numpy.array([ rk['std'] for rk in r ]), name='std',  description='Standard deviation')
+		if 'q' in val:
+			q = numpy.array([ rk['q'] for rk in r ]).T
+			for k, qk in enumerate(qlist):
+				s.addCol(q[k], name='q%g' % qk,  description='%g quantile' % qk)
+		if 'hpd' in val:
+			h = numpy.array([ rk['hpd'] for rk in r ]).T
+			txt = 'range of %g%% highest probable density' % (100 * (1 - alpha))
+			s.addCol(h[0], name='hpdmin',  description='min ' + txt)
+			s.addCol(h[1], name='hpdmax',  description='max ' + txt)
 
-				Available statistics:
-				
-					hpd   -- highest probable density at 95%
-					mean  -- mean value
-					min   -- minimal value
-					max   -- maximal value
-					n     -- sample length
-					q     -- quantiles: 2.5, 25, 50, 75, 97.5
-					std   -- standard deviation
-			"""
-			import mystats
-			from numpy import nan
-			if fields==None:
-				fields= self.keys()
-			n = len(fields)
+		return s
 
-			def mean(a):
-				try:
-					return numpy.mean(a)
-				except TypeError:
-					return numpy.nan
-			def min(a):
-				try:
-					return numpy.min(a)
-				except TypeError:
-					return numpy.nan
-			def max(a):
-				try:
-					return numpy.max(a)
-				except TypeError:
-					return numpy.nan
-			def std(a):
-				try:
-					return numpy.std(a)
-				except TypeError:
-					return numpy.nan
-			def quantiles(a):
-				try:
-					q = mystats.quantiles(a)
-					return [ q[k] for k in q]
-				except:
-					return [numpy.nan]*5
-			def hpd(a):
-				try:
-					return mystats.hpd(a, 0.05)
-				except:
-					return [numpy.nan]*2
-
-			s = Table(name='%s, Statistics' % self.header['NAME'])
-
-			s.addCol(fields, name='Field')
-			if 'n' in val:
-				n = numpy.array([ len(self[k])  for k in fields ])
-				s.addCol(n, name='n',  comment='sample length')
-				del n
-			if 'mean' in val:
-				mean =  numpy.array([ mean(self[k]) for k in fields ])
-				s.addCol(mean, name='mean',  comment='mean value')
-				del mean
-			if 'min' in val:
-				_min =  numpy.array([ min(self[k]) for k in fields ])
-				s.addCol(_min, name='min',  comment='minimum value')
-				del _min
-			if 'max' in val:
-				_max =  numpy.array([ max(self[k]) for k in fields ])
-				s.addCol(_max, name='max',  comment='maximum value')
-				del _max
-			if 'std' in val:
-				_std =  numpy.array([ std(self[k]) for k in fields ])
-				s.addCol(_std, name='std',  comment='Standard deviation')
-				del _std
-			if 'q' in val:
-				q =  numpy.array([ quantiles(self[k]) for k in fields ]).T
-				s.addCol(q[0], name='q2.5',  comment='2.5 quantile')
-				s.addCol(q[1], name='q25',  comment='25 quantile')
-				s.addCol(q[2], name='q50',  comment='50 quantile')
-				s.addCol(q[3], name='q75',  comment='75 quantile')
-				s.addCol(q[4], name='q97.5',  comment='97.5 quantile')
-				del q
-			if 'hpd' in val:
-				h =  numpy.array([ hpd(self[k]) for k in fields ]).T
-				s.addCol(h[0], name='hpdmin',  comment='min range of 95% highest probable density')
-				s.addCol(h[1], name='hpdmax',  comment='min range of 95% highest probable density')
-
-			return s
-	
-	except ImportError:
-		pass
+#==============================================================================
+class TableColumnStore(UserDict.DictMixin): 
+	""" Column storage of the distributed tables
+	Each column is stored as a raw .npy file (columns sub-directory) and
+	read as a memory map (no copy, pages shared between processes).
+	Only the small metadata (column files and headers, table header)
+	are kept in the PickleShareDB of the storage directory.
+	Setting a column only rewrites the file of this column.
+	"""
+#==============================================================================
+	def __init__(self, storage, mmap_mode='r'):
+		""" Constructor
+		inputs:
+			storage   -- storage directory
+		keywords:
+			mmap_mode -- memory mapping mode of the columns
+				     (see numpy.load), 'r+' allows in place
+				     modifications of the files
+		"""
+		self.db = _require('mypickleshare', 'mps').PickleShareDB(storage)
+		self.root = str(self.db.root)
+		self.coldir = os.path.join(self.root, 'columns')
+		if not os.path.isdir(self.coldir):
+			os.makedirs(self.coldir)
+		self.mmap_mode = mmap_mode
+		self._cols = {}
+		try:
+			self._meta = self.db['__COLUMNS__']
+		except KeyError:
+			self._meta = {}
+		self._convert()
+
+	def _convert(self):
+		""" -- Internal use --
+		moves the columns pickled by previous versions into the store """
+		old = [ k for k in self.db.keys() if (k[:2] != '__') and \
+				(not k.startswith('columns/')) ]
+		for k in old:
+			self[k] = self.db[k]
+			del self.db[k]
+
+	def _fileName(self, name):
+		""" -- Internal use -- returns a new file name for a column """
+		used = set([ v['file'].lower() for v in self._meta.itervalues() ])
+		fname = re.sub('[^A-Za-z0-9_.+-]', '_', str(name)) or 'col'
+		i = 0
+		while (fname + '.npy').lower() in used:
+			i += 1
+			fname = '%s_%d' % (re.sub('[^A-Za-z0-9_.+-]', '_', str(name)), i)
+		return fname + '.npy'
+
+	def _saveMeta(self):
+		""" -- Internal use -- stores the columns description """
+		self.db['__COLUMNS__'] = self._meta
 
-try:
-	import mypickleshare as mps		
-	#==============================================================================
-	class distributedTable(Table): 
-		""" This class implements a Table object that tends to have the minimum
-		memory impact. Useful for huge tables"""
-
-	#==============================================================================
-		def __init__(self, storage, iterable=None, colNames=None, header=None,
-				verbose=True, name=None, *args,**kwargs):
-			""" Constructor
-				This can be called without any arguments.
-				Without any arguments, you will generate an empty table
-				that would mbe meant to accept new data later on.
-				It can also convert iterable datasets (dict, array...)
-				to Table objects
+	def keys(self):
+		return self._meta.keys()
+
+	def __contains__(self, k):
+		return k in self._meta
+
+	def has_key(self, k):
+		return k in self._meta
+
+	def __iter__(self):
+		return iter(self._meta.keys())
+
+	def __len__(self):
+		return len(self._meta)
+
+	def __getitem__(self, k):
+		if k in self._cols:
+			return self._cols[k]
+		if not k in self._meta:
+			raise KeyError(k)
+		info = self._meta[k]
+		arr = numpy.load(os.path.join(self.coldir, info['file']), 
+				mmap_mode=self.mmap_mode)
+		col = arr.view(TableColumn)
+		col.header = TableColumnHeader(k, arr.dtype, info['unit'], 
+				info['description'], info['null'], info['format'])
+		self._cols[k] = col
+		return col
+
+	def __setitem__(self, k, col):
+		if isinstance(col, TableColumnProxy):
+			col = col.load()
+		hdr = getattr(col, 'header', None)
+		arr = numpy.asarray(col)
+		if k in self._meta:
+			fname = self._meta[k]['file']
+		else:
+			fname = self._fileName(k)
+		#the new file replaces the previous one when complete
+		tmp = os.path.join(self.coldir, '.%s.tmp.npy' % fname[:-4])
+		numpy.save(tmp, arr)
+		os.rename(tmp, os.path.join(self.coldir, fname))
+		info = {'file': fname, 'unit': None, 'description': None, 
+			'null': None, 'format': None}
+		if hdr is not None:
+			for key in ['unit', 'description', 'null', 'format']:
+				info[key] = hdr[key]
+		self._meta[k] = info
+		self._cols.pop(k, None)
+		self._saveMeta()
+
+	def __delitem__(self, k):
+		info = self._meta.pop(k)
+		self._cols.pop(k, None)
+		try:
+			os.remove(os.path.join(self.coldir, info['file']))
+		except OSError:
+			pass
+		self._saveMeta()
+
+	def saveHeaders(self):
+		""" stores the column headers modified in memory """
+		for k, col in self._cols.iteritems():
+			for key in ['unit', 'description', 'null', 'format']:
+				self._meta[k][key] = col.header[key]
+		self._saveMeta()
+
+	def getHeader(self):
+		""" returns the table header stored with the columns """
+		try:
+			return self.db['__HEADER__']
+		except KeyError:
+			return None
+
+	def setHeader(self, header):
+		""" stores the table header """
+		self.db['__HEADER__'] = header
+
+#==============================================================================
+class distributedTable(Table): 
+	""" This class implements a Table object that tends to have the minimum
+	memory impact. Useful for huge tables"""
+
+#==============================================================================
+	def __init__(self, storage, iterable=None, colNames=None, header=None,
+			verbose=True, name=None, mmap_mode='r', *args,**kwargs):
+		""" Constructor
+			This can be called without any arguments.
+			Without any arguments, you will generate an empty table
+			that would mbe meant to accept new data later on.
+			It can also convert iterable datasets (dict, array...)
+			to Table objects
+		inputs:
+			iterable -- iterable object that stores the data
+				    iteration over data dimensions (not rows)
+			colNames -- [iterable] 
+				    if specified, defines the name that are used
+				    for the columns
+			header   -- [dict]
+				    Any key of the dictionary will be stored
+				    into the Table header.
+			name 	 -- Table Name
+		     mmap_mode -- memory mapping mode of the columns
+				  (see TableColumnStore)
+
+		"""
+		self.data = TableColumnStore(storage, mmap_mode=mmap_mode)
+		self.sourceTable = None
+		self.sourceManager = None
+		self._sourceCols = set()
+		self._indexes = {}
+		self._rowBuffers = {}
+		self._versions = {}
+		self.virtual = {}
+		if len(self.data) > 0:
+			self.source = None
+			self.nrows = numpy.shape(self.data[self.keys()[0]])[0]
+			self.ncols = len(self.data)
+			self.header = self.data.getHeader()
+			if self.header is None:
+				self.header = TableHeader(header, **kwargs)
+			self.header['STORAGE'] = storage
+		else:
+			self.source = None
+			self.nrows = 0
+			self.ncols = 0
+			#Table header
+			self.header = TableHeader(header, **kwargs)
+			if name != None:
+				self.setName(name)
+			#Gen Columns
+			if iterable != None:
+				assert(_isiterable(iterable))
+				if isinstance(iterable, dict):
+					for kCol in iterable:
+						self.addCol( TableColumn(iterable[kCol], name=kCol) )
+				elif isinstance(iterable, numpy.core.records.recarray):
+					print "Converting from recarray not implemented yet"
+				else:	
+					i = 0
+					for kCol in iterable:
+						i += 1
+						if isinstance(kCol, TableColumn):
+							self.addCol(TableColumn(kCol))
+						else:
+							colName = 'Col%s' % i
+							if (colNames != None) & (numpy.size(colNames) >= i):
+								colName = colNames[i-1]
+								self.addCol(TableColumn(kCol,name=colName))
+			elif colNames != None:
+				assert(_isiterable(colNames))
+				for kCol in colNames:
+					self.addCol( TableColumn(None, name=kCol) )
+	def __del__(self):
+		self.saveheader()
+		Table.__del__(self)
+
+	def saveheader(self):
+		""" stores the table and column headers (metadata only) """
+		if self.header != None:
+			self.data.setHeader(self.header)
+		self.data.saveHeaders()
+#==============================================================================
+class TableView(Table): 
+	""" Lazy selection of rows of a parent table
+	The view only stores the parent table and the indices of the selected
+	rows. Column data are gathered from the parent when a column is
+	actually read (or written out). Selections of views are combined with
+	the view indices and refer directly to the parent table.
+	"""
+#==============================================================================
+	def __init__(self, parent, ind=None, fields=None, name=None):
+		""" Constructor
+		inputs:
+			parent -- Table (or TableView) to select from
+			ind    -- selected rows (slice, boolean mask or indices) 
+			          if not provided, all rows are selected
+		keywords:
+			fields -- only keep these columns
+			name   -- table name 
+		"""
+		Table.__init__(self, name=name or parent.header['NAME']+'_view')
+		if ind is None:
+			ind = slice(None)
+		if isinstance(ind, slice):
+			ind = numpy.arange(parent.nrows)[ind]
+		elif isinstance(ind, tuple):
+			#output of numpy.where
+			ind = numpy.asarray(ind[0])
+		else:
+			ind = numpy.asarray(ind)
+			if ind.dtype == bool:
+				ind = numpy.where(ind)[0]
+		if fields is None:
+			fields = parent.keys()
+		self.parent = parent
+		self.index  = ind
+		# origin of each column: (table, indices) 
+		self._origins = {}
+		for k in fields:
+			src, sind = (parent, ind)
+			if isinstance(parent, TableView) and (k in parent._origins) \
+					and (not parent.data.isloaded(k)):
+				#combine the selections
+				src, sind = parent._origins[k]
+				sind = sind[ind]
+			self._origins[k] = (src, sind)
+			hdr = src.getColHeader(k)
+			shape = (len(sind),) + tuple(src._peekCol(k).shape[1:])
+			self.data[k] = TableColumnProxy(self._gatherer(src, k, sind), 
+							hdr.shared(), shape)
+		self.nrows = len(ind)
+		self.ncols = len(self.data)
+
+	def _gatherer(self, src, name, ind):
+		""" -- Internal use --
+		Returns the function that gathers the selected rows of a column """
+		def gather():
+			return numpy.asarray(src.getCol(name))[ind]
+		return gather
+
+#==============================================================================
+class TableGroupBy(object): 
+	""" Groups of rows of a table sharing the same key values 
+	(see Table.groupby)
+	The rows are grouped once (sort of the key codes), and the reductions
+	are computed for all the groups at once (numpy reduceat).
+
+	Available reductions (agg):
+		count         -- number of rows
+		sum, mean     -- sum and mean value
+		min, max      -- minimum and maximum value
+		std           -- standard deviation
+		median, q<p>  -- quantiles, e.g. q2.5, q25, q97.5
+		first, last   -- value of the first/last row of the group
+		any function  -- applied to the values of each group
+	"""
+#==============================================================================
+	def __init__(self, table, keys):
+		""" Constructor
+		inputs:
+			table -- Table to group
+			keys  -- column name or list of column names
+		"""
+		if isinstance(keys, str):
+			keys = [keys]
+		self.table = table
+		self.keys = list(keys)
+		codes = _groupCodes([ table[k] for k in self.keys ])
+		self.order = numpy.argsort(codes, kind='mergesort')
+		self.counts = numpy.bincount(codes)
+		self.starts = numpy.cumsum(self.counts) - self.counts
+		self.ngroups = len(self.counts)
+		#group of each row of the sorted table
+		self._gid = numpy.repeat(numpy.arange(self.ngroups), self.counts)
+		self._sorted = {}
+
+	def __len__(self):
+		return self.ngroups
+
+	def __iter__(self):
+		""" iterates over the (key values, sub-table) of each group """
+		keys = [ numpy.asarray(self.table[k])[self.order[self.starts]] for k in self.keys ]
+		for i in range(self.ngroups):
+			ind = self.order[self.starts[i]:self.starts[i] + self.counts[i]]
+			yield tuple([ k[i] for k in keys ]), self.table.extract(ind)
+
+	def _values(self, name):
+		""" -- Internal use -- column values sorted by groups """
+		return numpy.asarray(self.table[name])[self.order]
+
+	def _groupSorted(self, name):
+		""" -- Internal use -- 
+		column values sorted by groups and by values within each group """
+		if not name in self._sorted:
+			v = self._values(name)
+			if v.ndim > 1:
+				raise Exception("Column %s: quantiles require 1d columns" % name)
+			self._sorted[name] = v[numpy.lexsort((v, self._gid))]
+		return self._sorted[name]
+
+	def reduce(self, name, func):
+		""" returns the reduction func of a column over all the groups 
 			inputs:
-				iterable -- iterable object that stores the data
-					    iteration over data dimensions (not rows)
-				colNames -- [iterable] 
-					    if specified, defines the name that are used
-					    for the columns
-				header   -- [dict]
-					    Any key of the dictionary will be stored
-					    into the Table header.
-				name 	 -- Table Name
+				name -- column name
+				func -- reduction name (see class doc) or function 
+		"""
+		if self.ngroups == 0:
+			return numpy.zeros(0)
+		if hasattr(func, '__call__'):
+			v = self._values(name)
+			return numpy.array([ func(v[i0:i0 + n]) for i0, n in zip(self.starts, self.counts) ])
+		if func == 'count':
+			return self.counts.copy()
+		if func == 'first':
+			return self._values(name)[self.starts]
+		if func == 'last':
+			return self._values(name)[self.starts + self.counts - 1]
+		if func == 'median':
+			func = 'q50'
+		if func[0] == 'q':
+			q = float(func[1:])
+			ind = (self.counts * q / 100.).astype(int)
+			ind = numpy.minimum(ind, self.counts - 1)
+			return self._groupSorted(name)[self.starts + ind]
+		v = self._values(name)
+		numeric = v.dtype.kind in 'biufc'
+		if func == 'min':
+			if not numeric:
+				return self._groupSorted(name)[self.starts]
+			return numpy.minimum.reduceat(v, self.starts)
+		if func == 'max':
+			if not numeric:
+				return self._groupSorted(name)[self.starts + self.counts - 1]
+			return numpy.maximum.reduceat(v, self.starts)
+		shape = (-1,) + (1,) * (v.ndim - 1)
+		if func == 'sum':
+			return numpy.add.reduceat(v, self.starts)
+		if func == 'mean':
+			return numpy.add.reduceat(v, self.starts) / self.counts.reshape(shape).astype(float)
+		if func == 'std':
+			m = self.reduce(name, 'mean')
+			d = v - m[self._gid]
+			return numpy.sqrt(numpy.add.reduceat(d * d, self.starts) / \
+					self.counts.reshape(shape).astype(float))
+		raise Exception("Reduction %s is not managed" % func)
+
+	def keyTable(self):
+		""" returns the table of the key values of each group """
+		tab = Table(name='%s, groups' % self.table.header['NAME'])
+		first = self.order[self.starts]
+		for k in self.keys:
+			hdr = self.table.getColHeader(k)
+			tab.addCol(numpy.asarray(self.table[k])[first], name=k, 
+					unit=hdr['unit'], description=hdr['description'])
+		return tab
+
+	def agg(self, spec):
+		""" Returns a table with the key values and the reductions of
+		columns over each group (one line per group)
+		Output columns are named <column>_<reduction>, units are kept
+		(except for count).
+			inputs:
+				spec -- dictionary {column: reduction(s)}
+					e.g. {'mag': ['mean', 'std'], 'x': 'count'}
+		"""
+		tab = self.keyTable()
+		for name in sorted(spec.keys()):
+			funcs = spec[name]
+			if isinstance(funcs, str) or hasattr(funcs, '__call__'):
+				funcs = [funcs]
+			hdr = self.table.getColHeader(name)
+			for func in funcs:
+				fname = getattr(func, '__name__', func)
+				unit = hdr['unit']
+				if fname == 'count':
+					unit = None
+				tab.addCol(self.reduce(name, func), name='%s_%s' % (name, fname),
+						unit=unit, description='%s of %s' % (fname, name))
+		return tab
 
-			"""
-			self.data = mps.PickleShareDB(storage)
-			if len(self.data) > 0:
-				self.source = None
-				self.nrows = numpy.shape(self.data[self.keys()[0]])[0]
-				self.ncols = len(self.data)
-				if not '__HEADER__' in self:
-					self.header = TableHeader(header, **kwargs)
-				else:
-					self.header = self.data['__HEADER__']
-				self.header['STORAGE'] = storage
+#==============================================================================
+class TableColumnIndex(object): 
+	""" Sorted index of a column (see Table.createIndex)
+	It stores the sorting permutation of the column so that comparisons
+	with constants are solved with binary searches (numpy.searchsorted).
+	NaN values are never matched, except by != comparisons.
+	The indexed column is read-only until the index is released: in-place
+	modifications would make the index invalid.
+	"""
+#==============================================================================
+	def __init__(self, column, order=None):
+		""" Constructor
+		inputs:
+			column -- indexed column
+		keywords:
+			order  -- sorting permutation of the column if already known
+		"""
+		self.column = column
+		if order is None:
+			order = numpy.argsort(numpy.asarray(column), kind='mergesort')
+		self.order = order
+		self._values = None
+		self._writeable = column.flags.writeable
+		column.flags.writeable = False
+
+	def release(self):
+		""" makes the column modifiable again (the index is dropped) """
+		if self._writeable:
+			try:
+				self.column.flags.writeable = True
+			except ValueError:
+				pass
+		self._writeable = False
+
+	def isvalid(self, column):
+		""" returns if the index corresponds to the given column object """
+		return (column is self.column)
+
+	@property
+	def values(self):
+		""" sorted values of the column """
+		if self._values is None:
+			self._values = numpy.asarray(self.column)[self.order]
+			if self._values.dtype.kind in 'fc':
+				#NaN values are sorted at the end
+				self.nvalid = len(self._values) - int(numpy.isnan(self._values).sum())
 			else:
-				self.source = None
-				self.nrows = 0
-				self.ncols = 0
-				#Table header
-				self.header = TableHeader(header, **kwargs)
-				if name != None:
-					self.setName(name)
-				#Gen Columns
-				if iterable != None:
-					assert(_isiterable(iterable))
-					if isinstance(iterable, dict):
-						for kCol in iterable:
-							self.addCol( TableColumn(iterable[kCol], name=kCol) )
-					elif isinstance(iterable, numpy.core.records.recarray):
-						print "Converting from recarray not implemented yet"
-					else:	
-						i = 0
-						for kCol in iterable:
-							i += 1
-							if isinstance(kCol, TableColumn):
-								self.addCol(TableColumn(kCol))
-							else:
-								colName = 'Col%s' % i
-								if (colNames != None) & (numpy.size(colNames) >= i):
-									colName = colNames[i-1]
-									self.addCol(TableColumn(kCol,name=colName))
-				elif colNames != None:
-					assert(_isiterable(colNames))
-					for kCol in colNames:
-						self.addCol( TableColumn(None, name=kCol) )
-		def __del__(self):
-			self.saveheader()
-			Table.__del__(self)
-
-		def saveheader(self):
-			if self.header != None:
-				self.data['__HEADER__'] = self.header
+				self.nvalid = len(self._values)
+		return self._values
+
+	def ranges(self, op, val):
+		""" returns the ranges of the sorted values for which 
+		column <op> val (op is an ast comparison operator class) """
+		v = self.values
+		n = self.nvalid
+		if (v.dtype.kind in 'SU') != isinstance(val, basestring):
+			raise ValueError('incompatible types')
+		if op == ast.Lt:
+			return [(0, numpy.searchsorted(v[:n], val, 'left'))]
+		elif op == ast.LtE:
+			return [(0, numpy.searchsorted(v[:n], val, 'right'))]
+		elif op == ast.Gt:
+			return [(numpy.searchsorted(v[:n], val, 'right'), n)]
+		elif op == ast.GtE:
+			return [(numpy.searchsorted(v[:n], val, 'left'), n)]
+		elif op == ast.Eq:
+			return [(numpy.searchsorted(v[:n], val, 'left'), 
+				 numpy.searchsorted(v[:n], val, 'right'))]
+		elif op == ast.NotEq:
+			return [(0, numpy.searchsorted(v[:n], val, 'left')),
+				(numpy.searchsorted(v[:n], val, 'right'), len(v))]
+		raise ValueError('operator not managed')
+
+	def rows(self, ranges):
+		""" returns the (unsorted) indices of the rows in the ranges """
+		return numpy.concatenate([ numpy.zeros(0, dtype=int) ] + \
+			[ numpy.asarray(self.order[i0:i1]) for i0, i1 in ranges if i1 > i0 ])
+
+def _intersectRanges(r1, r2):
+	""" 
+	-- Internal use --
+	intersection of two lists of ranges [(start, stop), ...]
+	"""
+	r = [ (max(a[0], b[0]), min(a[1], b[1])) for a in r1 for b in r2 ]
+	return [ k for k in r if k[1] > k[0] ]
+
+#==============================================================================
+class TableVirtualColumn(object): 
+	""" Column defined by an expression of other columns 
+	(see Table.addVirtualCol)
+	The values are computed when the column is read and kept until one of
+	the columns used by the expression changes.
+	"""
+#==============================================================================
+	def __init__(self, expr, depends, header, exprvars=None, colnames=()):
+		""" Constructor
+		inputs:
+			expr     -- expression of the column (see evalexpr)
+			depends  -- columns used by the expression
+			header   -- TableColumnHeader of the column
+		keywords:
+			exprvars -- dictionary of external variables
+			colnames -- column names the expression refers to
+				    (see compileExpr)
+		"""
+		self.expr = expr
+		self.plan = compileExpr(expr, colnames)
+		self.depends = depends
+		self.header = header
+		self.exprvars = exprvars
+		self.value = None
+		self.key = None
 
-		def keys(self):
-			""" returns the data key names """
-			k = self.data.keys()
-			return [ l for l in k if (l[:2] != '__') ]
+	def isvalid(self, key):
+		""" returns if the computed values correspond to the given versions
+		of the columns used by the expression """
+		return (self.value is not None) and (self.key == key)
 
-		def has_key(self, k):
-			return self.data.has_key(k)
+	def clear(self):
+		""" releases the computed values """
+		self.value = None
+		self.key = None
 
-		def __iter__(self):
-			return (l for l in self.data.__iter__() if l[:2] != '__')
-except ImportError:
-	print 'Distributed Table are not avalable'
 #==============================================================================
 class TableColumnHeader(object): 
 	""" Manage how columns are described """
@@ -890,6 +2397,14 @@ class TableColumnHeader(object):
 		self.__dict__['null'] = null
 		self.format = format
 
+	def shared(self):
+		""" Returns the header of a view on the column (extract, slices,
+		TableView): a snapshot of the values (any key), so that later
+		changes of either header do not affect the other one """
+		hdr = object.__new__(TableColumnHeader)
+		hdr.__dict__.update(self.__dict__)
+		return hdr
+
 	def __getitem__(self, k):
 		return self.__dict__[k]
 
@@ -977,7 +2492,11 @@ class TableColumn(numpy.ndarray):
 	def __new__(self, input_array, *args, **kwargs):
 		# Input array is an already formed ndarray instance
 		# We first cast to be our class type
-		obj = numpy.array(input_array).view(self)
+		# (copy=False shares the data of input_array when possible)
+		if kwargs.get('copy', True):
+			obj = numpy.array(input_array).view(self)
+		else:
+			obj = numpy.asarray(input_array).view(self)
 		# add the new attribute to the created instance
 		self.header = None
 		if isinstance(self, TableColumn):
@@ -990,14 +2509,17 @@ class TableColumn(numpy.ndarray):
 		return obj
 
 	def __init__(self, data, name='None', dtype=None, unit=None, description=None, null=None,
-			format=None, *args, **kwargs):
+			format=None, copy=True, *args, **kwargs):
 
 		if self.header == None:
 			self.header = TableColumnHeader(name, self.dtype, unit, description,
 								null, format)
 		if isinstance(data, TableColumn):
 			if data.header != None:
-				self.header = data.header.copy()
+				if copy:
+					self.header = data.header.copy()
+				else:
+					self.header = data.header.shared()
 	
 	def __repr__(self):
 		s = ""	
@@ -1094,22 +2616,100 @@ class TableColumn(numpy.ndarray):
 			setattr(self, name, value)
 	"""
 #==============================================================================
-class TableHeader(object): 
-	""" this class defines the context of a Table """
+class TableColumnProxy(object): 
+	""" Placeholder of a column whose data are only read on first access
+	(lazy tables). It carries the column header and shape so that the
+	table can be described without reading any data. """
 #==============================================================================
-	def __init__(self, dic=None, *args, **kwargs):
-		""" constructor """
-		for k, v in kwargs:
-			self.__setattr__(k,v)
-		if (isinstance(dic, dict)) or (isinstance(dic, TableHeader)):
-			for k, v in dic.iteritems():
-				self.__setattr__(k, v)
-		if not 'NAME' in kwargs:
-			self.__setattr__('NAME', 'Noname')
+	def __init__(self, loader, header, shape):
+		""" constructor
+		inputs:
+			loader -- function without argument returning the data
+			header -- TableColumnHeader of the column
+			shape  -- shape of the column data
+		"""
+		self.loader = loader
+		self.header = header
+		self.shape  = tuple(shape)
 
-	def __setattr__(self, attribute, value):
-		""" set attribute """
-		if (attribute.lower() in ['description', 'comment', 'history']) & \
+	def __len__(self):
+		return self.shape[0]
+
+	@property
+	def dtype(self):
+		return self.header.dtype
+
+	def load(self):
+		""" read the data and returns the corresponding TableColumn """
+		col = numpy.asarray(self.loader()).view(TableColumn)
+		col.header = self.header
+		return col
+
+	def __repr__(self):
+		return "Column: %s, (not loaded) shape=%s" % (self.header.name, str(self.shape))
+
+#==============================================================================
+class TableColumnDict(dict): 
+	""" Dictionary of the table columns.
+	Values can be TableColumnProxy objects that are replaced by the actual
+	column on first access (the data are read only once). """
+#==============================================================================
+	def __getitem__(self, k):
+		col = dict.__getitem__(self, k)
+		if isinstance(col, TableColumnProxy):
+			col = col.load()
+			dict.__setitem__(self, k, col)
+		return col
+
+	def peek(self, k):
+		""" returns the stored value without reading proxy columns """
+		return dict.__getitem__(self, k)
+
+	def isloaded(self, k):
+		""" returns if the column data has already been read """
+		return not isinstance(dict.__getitem__(self, k), TableColumnProxy)
+
+	def get(self, k, default=None):
+		if k in self:
+			return self[k]
+		return default
+
+	def pop(self, k, *args):
+		if k in self:
+			col = self[k]
+			dict.__delitem__(self, k)
+			return col
+		return dict.pop(self, k, *args)
+
+	def values(self):
+		return [ self[k] for k in self ]
+
+	def itervalues(self):
+		return ( self[k] for k in self )
+
+	def items(self):
+		return [ (k, self[k]) for k in self ]
+
+	def iteritems(self):
+		return ( (k, self[k]) for k in self )
+
+#==============================================================================
+class TableHeader(object): 
+	""" this class defines the context of a Table """
+#==============================================================================
+	def __init__(self, dic=None, *args, **kwargs):
+		""" constructor """
+		for k, v in kwargs:
+			self.__setattr__(k,v)
+		if (isinstance(dic, dict)) or (isinstance(dic, TableHeader)):
+			for k, v in dic.iteritems():
+				self.__setattr__(k, v)
+		if not 'NAME' in self:
+			self.__setattr__('NAME', 'Noname')
+
+	def __setattr__(self, attribute, value):
+		""" set attribute """
+		if (attribute.lower() in ['description', 'comment', 'history']) & \
 			(attribute in self) :
 				self.__dict__[attribute] = self[attribute]+'\n'+value
 		else:
@@ -1188,9 +2788,17 @@ class TableManager(object):
 		register_extension function
 	"""
 #==============================================================================
-	def __init__(self, tableType, readerFunction = None, writerFunction = None):
-		""" constructor """
+	def __init__(self, tableType, readerFunction = None, writerFunction = None,
+			requires=None):
+		""" constructor 
+		requires -- modules needed by the manager, imported when the
+			    manager is created (see register_extension)
+		"""
+		for module in (requires or []):
+			_require(module)
 		self.tableType = tableType
+		#text formats can be stored into the parse cache
+		self.cacheable = False
 		if readerFunction:
 			del self.read
 			self.read = readerFunction
@@ -1202,6 +2810,40 @@ class TableManager(object):
 		""" to be overwritten """
 		pass
 
+	def iterread(self, *args, **kwargs):
+		""" to be overwritten if the format can be read by chunks
+		    (generator of (data, description) pairs) """
+		raise Exception("Chunked reading is not available for %s tables" % self.tableType)
+
+	def getWhereList(self, table, condition, condvars=None, **kwargs):
+		""" to be overwritten if the source of a table (table.sourceTable)
+		    can evaluate conditions. Returns the indices of the matching
+		    rows or None to use the in-memory evaluation """
+		return None
+
+	def readWhere(self, table, condition, condvars=None, fields=None, **kwargs):
+		""" to be overwritten if the source of a table (table.sourceTable)
+		    can evaluate conditions. Returns the list of matching columns
+		    or None to use the in-memory evaluation """
+		return None
+
+	def _loaded(self, table, condition, fields=()):
+		""" -- Internal use --
+		Returns if columns used by a query (condition and fields) are
+		already in memory. They may have been modified since they were
+		read, the query must then be evaluated in memory. """
+		if not hasattr(table.data, 'isloaded'):
+			return True
+		names = [ k for k in compileExpr(condition, table.keys()).names \
+				if k in table._sourceCols ]
+		names += [ k for k in (fields or []) if k in table.data ]
+		return numpy.any([ table.data.isloaded(k) for k in names ])
+
+	def createIndex(self, table, name, index):
+		""" to be overwritten if the source of a table (table.sourceTable)
+		    can store the index of a column (TableColumnIndex) """
+		return None
+
 	def write(self, *args, **kwargs):
 		""" to be overwritten """
 		pass
@@ -1211,28 +2853,339 @@ class TableManager(object):
 #==============================================================================
 import numpy
 
+def _readTextColumns(stream, ncols, delimiter=None, comments='#', **kwargs):
+	""" 
+	-- Internal use --
+	Parse the data lines of a text stream into a list of column arrays
+	inputs:
+		stream -- file-like object positioned at the first data line
+		ncols  -- expected number of columns
+	keywords:
+		**kwargs are sent to numpy.genfromtxt
+	"""
+	kwargs.setdefault('dtype', None)
+	with warnings.catch_warnings():
+		warnings.simplefilter('ignore')
+		d = numpy.genfromtxt(stream, delimiter=delimiter, comments=comments, **kwargs)
+	if d.size == 0:
+		#no data lines (e.g. header-only file): empty columns
+		return [ numpy.array([]) for k in range(ncols) ]
+	if d.dtype.names != None:
+		d = numpy.atleast_1d(d)
+		return [ d[k] for k in d.dtype.names ]
+	elif d.ndim == 2:
+		return [ d[:,k] for k in range(d.shape[1]) ]
+	elif (ncols > 1) & (d.size == ncols):
+		#only one line of homogeneous values
+		return [ d[k:k+1] for k in range(ncols) ]
+	else:
+		return [ numpy.atleast_1d(d) ]
+
+def _makeTextColumns(header, colInfo, cols):
+	""" 
+	-- Internal use --
+	Associate column names, units and comments to parsed text columns 
+	"""
+	data = {}
+	for k in range(len(header)):
+		colName = header[k]
+		if colInfo.has_key(colName):
+			colUnit, colComm = colInfo[colName]
+			if colUnit == 'None': colUnit = None
+			if colComm == 'None': colComm = None
+		else:
+			colUnit, colComm = (None,None)
+		if colName in data:
+			i=1
+			while '%s_%d' % (colName, i) in data:
+				i += 1
+			colName = '%s_%d' % (colName, i)
+		data[colName] = TableColumn(cols[k], name=colName, unit=colUnit, description=colComm)
+	return data
+
+def _getTextFmt(col):
+	""" 
+	-- Internal use --
+	return the %-format string associated to a column from its header
+	(TableColumnHeader.format), defaults to str() conversion.
+	"""
+	fmt = getattr(getattr(col, 'header', None), 'format', None)
+	if (fmt == None) | (not isinstance(fmt, str)):
+		return '%s'
+	if fmt[0] != '%':
+		fmt = '%' + fmt
+	return fmt
+
+def _writeTextBlocks(data, unit, delimiter=' ', eol='\n', blocksize=50000):
+	""" 
+	-- Internal use --
+	Write the data part into the opened unit by blocks of rows.
+	As numpy.savetxt, the column formats are joined into a row format
+	and a whole block is formatted by a single %-operation on the
+	row-ordered values, then written as a single string.
+	inputs:
+		data -- dictionary of columns
+		unit -- opened stream
+	keywords:
+		delimiter -- column delimiter 
+		eol       -- end of line string
+		blocksize -- number of rows formatted and written at once
+	"""
+	keys = numpy.sort(data.keys())
+	fmts = [ _getTextFmt(data[k]) for k in keys ]
+	cols = [ numpy.asarray(data[k]) for k in keys ]
+	size = numpy.size(cols[0], 0)
+	blocksize = max(int(blocksize), 1)
+	delimiter = delimiter or ' '
+	rowfmt = (delimiter.replace('%', '%%')).join(fmts) + eol.replace('%', '%%')
+	for i0 in range(0, size, blocksize):
+		i1 = min(i0 + blocksize, size)
+		txt = []
+		for k in range(len(cols)):
+			block = cols[k][i0:i1]
+			if block.ndim > 1:
+				txt.append([ str(v) for v in block ])
+			elif fmts[k] == '%s':
+				txt.append(block.astype(str).tolist())
+			else:
+				txt.append(block.tolist())
+		values = tuple(itertools.chain.from_iterable(itertools.izip(*txt)))
+		unit.write((rowfmt * (i1 - i0)) % values)
+
+def _iterTextColumns(stream, ncols, chunksize, **kwargs):
+	""" 
+	-- Internal use --
+	Generates the parsed columns of an opened text stream by blocks of
+	chunksize lines. The column types are inferred from the first block
+	and the next blocks are converted to them (string widths and numbers
+	are widened when a block does not fit, e.g. S8 -> S12, int -> float,
+	so that later blocks never change the type back). Blocks without any
+	data line are skipped, a stream without data generates one block of
+	empty columns.
+	inputs:
+		stream    -- file-like object positioned at the first data line
+		ncols     -- expected number of columns
+		chunksize -- number of lines per block
+	keywords:
+		**kwargs are sent to numpy.genfromtxt
+	"""
+	types = None
+	for lines in _iterTextBlocks(stream, chunksize):
+		cols = _parseTextTypes(''.join(lines), ncols, types, **kwargs)
+		if numpy.size(cols[0]) == 0:
+			continue
+		if types is None:
+			types = [ c.dtype for c in cols ]
+		else:
+			types = [ numpy.promote_types(t, c.dtype) for t, c in zip(types, cols) ]
+		yield [ c.astype(t, copy=False) for c, t in zip(cols, types) ]
+	if types is None:
+		yield _readTextColumns(cStringIO.StringIO(''), ncols, **kwargs)
+
+def _iterTextBlocks(stream, chunksize):
+	""" 
+	-- Internal use --
+	Generates lists of at most chunksize lines from an opened stream 
+	"""
+	while True:
+		lines = list(itertools.islice(stream, chunksize))
+		if len(lines) == 0:
+			break
+		yield lines
+
+def _textRanges(filename, start, nparts):
+	""" 
+	-- Internal use --
+	Splits the data part of a text file (from the byte start) into at most
+	nparts byte ranges whose boundaries are aligned on line ends 
+	"""
+	size = os.path.getsize(filename)
+	bounds = [start]
+	f = open(filename, 'rb')
+	try:
+		for k in range(1, nparts):
+			pos = start + (size - start) * k // nparts
+			if pos <= bounds[-1]:
+				continue
+			#a range starts right after the end of a line
+			f.seek(pos - 1)
+			f.readline()
+			pos = f.tell()
+			if bounds[-1] < pos < size:
+				bounds.append(pos)
+	finally:
+		f.close()
+	bounds.append(size)
+	return zip(bounds[:-1], bounds[1:])
+
+def _agreeTypes(t1, t2):
+	""" 
+	-- Internal use --
+	returns the type that can represent the values of two parsed parts
+	(strings if one of them is a string) 
+	"""
+	if t1 is None:
+		return t2
+	if (t1.kind in 'SU') or (t2.kind in 'SU'):
+		return numpy.dtype('S')
+	return numpy.result_type(t1, t2)
+
+def _sampleTextTypes(filename, ranges, ncols, nlines=1000, nsamples=8, **kwargs):
+	""" 
+	-- Internal use --
+	Pre-pass over the first lines of regularly spaced byte ranges that
+	returns the type of each column agreed over the samples 
+	"""
+	step = max(1, len(ranges) // nsamples)
+	types = [None] * ncols
+	f = open(filename, 'rb')
+	try:
+		for b0, b1 in ranges[::step]:
+			f.seek(b0)
+			lines = []
+			while (len(lines) < nlines) and (f.tell() < b1):
+				lines.append(f.readline())
+			cols = _readTextColumns(cStringIO.StringIO(''.join(lines)), ncols, **kwargs)
+			if (len(cols) != ncols) or (numpy.size(cols[0]) == 0):
+				continue
+			types = [ _agreeTypes(types[k], cols[k].dtype) for k in range(ncols) ]
+	finally:
+		f.close()
+	return types
+
+def _parseTextRange(args):
+	""" 
+	-- Internal use --
+	Parses one byte range of a text file into a list of column arrays
+	converted to the agreed types (picklable for process pools) 
+	"""
+	filename, b0, b1, ncols, types, kwargs = args
+	f = open(filename, 'rb')
+	try:
+		f.seek(b0)
+		txt = f.read(b1 - b0)
+	finally:
+		f.close()
+	return _parseTextTypes(txt, ncols, types, **kwargs)
+
+def _parseTextTypes(txt, ncols, types=None, **kwargs):
+	""" 
+	-- Internal use --
+	Parses text lines into a list of column arrays converted to the
+	given types (None: inferred). Columns expected as strings are parsed
+	again as strings if they look like numbers in these lines.
+	"""
+	cols = _readTextColumns(cStringIO.StringIO(txt), ncols, **kwargs)
+	if (types is None) or (len(cols) != ncols) or (numpy.size(cols[0]) == 0):
+		return cols
+	if numpy.any([ (t is not None) and (t.kind == 'S') and (c.dtype.kind != 'S') \
+			for t, c in zip(types, cols) ]):
+		#strings that look like numbers in this part: parse them as strings
+		width = max([ len(l) for l in txt.split('\n') ])
+		kw = dict(kwargs)
+		kw['dtype'] = [ ('f%d' % k, (types[k] is not None) and \
+				(types[k].kind == 'S') and 'S%d' % width or cols[k].dtype) \
+				for k in range(ncols) ]
+		cols = _readTextColumns(cStringIO.StringIO(txt), ncols, **kw)
+		for k in range(ncols):
+			if cols[k].dtype.kind == 'S':
+				cols[k] = cols[k].astype('S%d' % max(1, numpy.char.str_len(cols[k]).max()))
+	for k in range(ncols):
+		if (types[k] is not None) and (types[k].kind != 'S') and (cols[k].dtype.kind != 'S'):
+			dtype = numpy.result_type(cols[k].dtype, types[k])
+			if dtype != cols[k].dtype:
+				cols[k] = cols[k].astype(dtype)
+	return cols
+
+def _readTextParallel(filename, start, ncols, processes=None, minsize=1 << 20, 
+		colnames=None, **kwargs):
+	""" 
+	-- Internal use --
+	Parse the data part of a text file (from the byte start) with a pool
+	of processes. The data are split into byte ranges aligned on line
+	ends, the column types are agreed from a sampled pre-pass so that
+	every range is parsed into compatible columns. Parts where a column
+	read as numbers while other parts hold strings (missed by the
+	sample) are parsed again as strings. The parts are then stitched
+	into preallocated columns (string widths are promoted).
+	inputs:
+		filename -- uncompressed text file
+		start    -- offset of the first data line
+		ncols    -- expected number of columns
+	keywords:
+		processes -- number of processes (def: number of cpus)
+		minsize   -- minimum size of a byte range
+		colnames  -- column names (error messages)
+		**kwargs are sent to numpy.genfromtxt
+	"""
+	import multiprocessing
+	processes = processes or multiprocessing.cpu_count()
+
+	def parse(args):
+		""" parses the byte ranges with the pool of processes """
+		if (processes <= 1) or (len(args) <= 1):
+			return map(_parseTextRange, args)
+		pool = multiprocessing.Pool(min(processes, len(args)))
+		try:
+			return pool.map(_parseTextRange, args)
+		finally:
+			pool.close()
+			pool.join()
+
+	size = os.path.getsize(filename) - start
+	nparts = max(1, min(4 * processes, size // max(int(minsize), 1)))
+	ranges = _textRanges(filename, start, nparts)
+	types = None
+	if kwargs.get('dtype', None) is None:
+		types = _sampleTextTypes(filename, ranges, ncols, **kwargs)
+	args = [ (filename, b0, b1, ncols, types, kwargs) for b0, b1 in ranges ]
+	parts = parse(args)
+	if types is not None:
+		#agree on the types of all the parts: the sample may have missed
+		#the strings of a column
+		found = [ i for i, p in enumerate(parts) \
+				if (len(p) == ncols) and (numpy.size(p[0]) > 0) ]
+		for i in found:
+			types = [ _agreeTypes(types[k], parts[i][k].dtype) for k in range(ncols) ]
+		redo = [ i for i in found if numpy.any([ (types[k] is not None) and \
+			(types[k].kind == 'S') and (parts[i][k].dtype.kind != 'S') \
+			for k in range(ncols) ]) ]
+		if len(redo) > 0:
+			newparts = parse([ args[i][:4] + (types, kwargs) for i in redo ])
+			for i, p in zip(redo, newparts):
+				parts[i] = p
+	colnames = colnames or [ 'Col%d' % k for k in range(ncols) ]
+	labels = [ 'bytes %d-%d' % r for r, p in zip(ranges, parts) if numpy.size(p[0]) > 0 ]
+	parts = [ [ TableColumn(c, name=colnames[k], copy=False) for k, c in enumerate(p) ] \
+			for p in parts if numpy.size(p[0]) > 0 ]
+	if len(parts) == 0:
+		return _readTextColumns(cStringIO.StringIO(''), ncols, **kwargs)
+	return [ numpy.asarray(c) for c in _concatenateColumns(parts, labels=labels) ]
+
+
 class csvManager(TableManager):
 	def __init__(self):
 		""" constructor """
 		TableManager.__init__(self, tableType='csv')
+		self.cacheable = True
 
-	def read(self, filename, delimiter=',', noheader=False, skiprows=0,
-	comment='#', *args, **kwargs):
+	def readHeader(self, stream, delimiter=',', noheader=False, comment='#'):
 		"""
-		Read Csv file with header or not. Especially useful in association with
-		exportdata module.
-		So far it uses also the numpy.loadtxt method
+		Parse the header part of an opened csv stream.
+		The stream is left positioned at the first data line.
+		inputs:
+			stream -- opened file object
+		outputs:
+			description -- TableHeader of the file
+			colInfo     -- dictionary of (unit, comment) per column
+			header      -- list of the column names
 		"""
-		data = {}
-		stream = open(filename, 'r')
-		#get header
 		description = TableHeader()
 		colInfo = {}
-		nHeadLines = 0
 		header = None
 		while header == None:
+			pos = stream.tell()
 			line = stream.readline()[:-1]
-			nHeadLines += 1
 			if line[0] == comment:
 				if line[1] != comment:
 					k = line[1:].split('\t')
@@ -1252,29 +3205,61 @@ class csvManager(TableManager):
 				if noheader:
 					header = ['Col%s' % k \
 							for k in range(len(header))]
+					#this line is already data
+					stream.seek(pos)
+		return description, colInfo, header
+
+	def read(self, filename, delimiter=',', noheader=False, skiprows=0,
+	comment='#', processes=1, *args, **kwargs):
+		"""
+		Read Csv file with header or not. Especially useful in association with
+		exportdata module.
+		So far it uses also the numpy.genfromtxt method
+		processes -- number of processes parsing the data by byte
+			     ranges (None: number of cpus, def: 1)
+			     compressed files are always read by one process
+		"""
+		stream = _openFile(filename, 'r')
+		description, colInfo, header = self.readHeader(stream, 
+				delimiter=delimiter, noheader=noheader, comment=comment)
 		if not 'NAME' in description.keys():
 			description['NAME'] = filename.split('/')[-1]
-		stream.close()
 		#get data
-		skip = skiprows+(nHeadLines-int(noheader))
-		d = numpy.recfromcsv(filename, skiprows=skip-1, *args, **kwargs) 
-		dkeys = d.dtype.names
-
-		for k in range(len(header)):
-			colName = header[k]
-			if colInfo.has_key(colName):
-				colUnit, colComm = colInfo[colName]
-				if colUnit == 'None': colUnit = None
-				if colComm == 'None': colComm = None
-			else:
-				colUnit, colComm = (None,None)
-			if colName in data:
-				i=1
-				while '%s_%d' % (colName, i) in data:
-					i += 1
-				colName = '%s_%d' % (colName, i)
-			data[colName] = TableColumn(d[dkeys[k]], name=colName, unit=colUnit, description=colComm)
-		return data, description
+		for k in range(skiprows): stream.readline()
+		if (processes != 1) and \
+				(not filename.lower().split('.')[-1] in _compressions):
+			start = stream.tell()
+			stream.close()
+			cols = _readTextParallel(filename, start, len(header), 
+					processes=processes, colnames=header,
+					delimiter=delimiter, comments=comment,
+					**kwargs)
+		else:
+			cols = _readTextColumns(stream, len(header), delimiter=delimiter,
+						comments=comment, **kwargs)
+			stream.close()
+		return _makeTextColumns(header, colInfo, cols), description
+
+	def iterread(self, filename, chunksize=100000, delimiter=',',
+			noheader=False, skiprows=0, comment='#', **kwargs):
+		"""
+		Generator that reads a csv file by blocks of chunksize lines.
+		The header is parsed once and each block is returned as a
+		(data, description) pair with the same column names, units and
+		descriptions.
+		"""
+		stream = _openFile(filename, 'r')
+		description, colInfo, header = self.readHeader(stream, 
+				delimiter=delimiter, noheader=noheader, comment=comment)
+		if not 'NAME' in description.keys():
+			description['NAME'] = filename.split('/')[-1]
+		for k in range(skiprows): stream.readline()
+		try:
+			for cols in _iterTextColumns(stream, len(header), chunksize,
+					delimiter=delimiter, comments=comment, **kwargs):
+				yield _makeTextColumns(header, colInfo, cols), description.copy()
+		finally:
+			stream.close()
 
 	def writeHeader(self, unit, header, comment='#'):
 		""" Write File Header definition into the opened unit """
@@ -1300,14 +3285,9 @@ class csvManager(TableManager):
 		for k in keys[1:]: txt+=delimiter+k
 		unit.write(txt+"\n")
 	
-	def writeData(self, data, unit, delimiter=','):
+	def writeData(self, data, unit, delimiter=',', blocksize=50000):
 		""" Write data part into the opened unit """
-		keys = numpy.sort(data.keys())
-		size = numpy.size(data[data.keys()[0]])
-		for ik in range(size):
-			txt = str(data[keys[0]][ik])
-			for k in keys[1:]: txt+=delimiter+str(data[k][ik])
-			unit.write(txt+"\n")
+		_writeTextBlocks(data, unit, delimiter=delimiter, blocksize=blocksize)
 
 	def write(self, data, header=None, output='exportedData.csv', 
 		delimiter=',', comment='#', keep=False, unit = None,
@@ -1332,7 +3312,7 @@ class csvManager(TableManager):
 		if unit != None:
 			outputFile = unit
 		else:
-			outputFile = open(output, 'w')
+			outputFile = _openFile(output, 'w')
 			if header != None: 
 				self.writeHeader(outputFile, header, comment='#')
 			self.writeColHeader(data, outputFile, comment=comment)
@@ -1351,25 +3331,30 @@ class asciiManager(TableManager):
 	def __init__(self):
 		""" constructor """
 		TableManager.__init__(self, tableType='ascii')
+		self.cacheable = True
 
-	def read(self, filename, delimiter=None, noheader=False, skiprows=0, comment='#', forceHeadLine=0, *args, **kwargs):
+	def readHeader(self, stream, delimiter=None, noheader=False, comment='#', forceHeadLine=0):
 		"""
-		Read ascii file with header or not. Especially useful in association with
-		exportdata module.
-		So far it uses also the numpy.loadtxt method
+		Parse the header part of an opened ascii stream.
+		The stream is left positioned at the first data line.
+		inputs:
+			stream -- opened file object
+		outputs:
+			description -- TableHeader of the file
+			colInfo     -- dictionary of (unit, comment) per column
+			header      -- list of the column names
 		"""
-		data = {}
-		stream = open(filename, 'r')
-		#get header
 		description = TableHeader()
 		colInfo = {}
 		nHeadLines = 0
 		header = None
 		oldline = ''
 		while header == None:
-			line = stream.readline()[:-1]
+			pos = stream.tell()
+			raw = stream.readline()
+			line = raw[:-1]
 			nHeadLines += 1
-			if (line[0] == comment) | (nHeadLines == forceHeadLine):
+			if (len(raw) > 0) & ((line[:1] == comment) | (nHeadLines == forceHeadLine)):
 				if line[1] != comment:
 					k = line[1:].split(delimiter)
 					key = k[0].split()[0] #remove trailing spaces
@@ -1389,31 +3374,65 @@ class asciiManager(TableManager):
 				if noheader:
 					header = ['Col%s' % k \
 							for k in range(len(header))]
-		stream.close()
-		if not 'NAME' in description.keys():
-			description['NAME'] = filename.split('/')[-1]
+				#this line is already data
+				stream.seek(pos)
 		if 'Column' in colInfo.keys():
 			colInfo.pop('Column')
+		return description, colInfo, header
+
+	def read(self, filename, delimiter=None, noheader=False, skiprows=0, comment='#', forceHeadLine=0, processes=1, *args, **kwargs):
+		"""
+		Read ascii file with header or not. Especially useful in association with
+		exportdata module.
+		So far it uses also the numpy.genfromtxt method
+		processes -- number of processes parsing the data by byte
+			     ranges (None: number of cpus, def: 1)
+			     compressed files are always read by one process
+		"""
+		stream = _openFile(filename, 'r')
+		description, colInfo, header = self.readHeader(stream, 
+				delimiter=delimiter, noheader=noheader, 
+				comment=comment, forceHeadLine=forceHeadLine)
+		if not 'NAME' in description.keys():
+			description['NAME'] = filename.split('/')[-1]
 		#get data
-		nHeadLines -= 1
-		skip = skiprows+(nHeadLines-int(noheader))
-		d = numpy.recfromtxt(filename, skiprows=skip-1, delimiter=delimiter, *args, **kwargs) 
-		dkeys = d.dtype.names
-		for k in range(len(header)):
-			colName = header[k]
-			if colInfo.has_key(colName):
-				colUnit, colComm = colInfo[colName]
-				if colUnit == 'None': colUnit = None
-				if colComm == 'None': colComm = None
-			else:
-				colUnit, colComm = (None,None)
-			if colName in data:
-				i=1
-				while '%s_%d' % (colName, i) in data:
-					i += 1
-				colName = '%s_%d' % (colName, i)
-			data[colName] = TableColumn(d[dkeys[k]], name=colName, unit=colUnit, description=colComm)
-		return data, description
+		for k in range(skiprows): stream.readline()
+		if (processes != 1) and \
+				(not filename.lower().split('.')[-1] in _compressions):
+			start = stream.tell()
+			stream.close()
+			cols = _readTextParallel(filename, start, len(header), 
+					processes=processes, colnames=header,
+					delimiter=delimiter, comments=comment,
+					**kwargs)
+		else:
+			cols = _readTextColumns(stream, len(header), delimiter=delimiter,
+						comments=comment, **kwargs)
+			stream.close()
+		return _makeTextColumns(header, colInfo, cols), description
+
+	def iterread(self, filename, chunksize=100000, delimiter=None,
+			noheader=False, skiprows=0, comment='#', forceHeadLine=0,
+			**kwargs):
+		"""
+		Generator that reads an ascii file by blocks of chunksize lines.
+		The header is parsed once and each block is returned as a
+		(data, description) pair with the same column names, units and
+		descriptions.
+		"""
+		stream = _openFile(filename, 'r')
+		description, colInfo, header = self.readHeader(stream, 
+				delimiter=delimiter, noheader=noheader, 
+				comment=comment, forceHeadLine=forceHeadLine)
+		if not 'NAME' in description.keys():
+			description['NAME'] = filename.split('/')[-1]
+		for k in range(skiprows): stream.readline()
+		try:
+			for cols in _iterTextColumns(stream, len(header), chunksize,
+					delimiter=delimiter, comments=comment, **kwargs):
+				yield _makeTextColumns(header, colInfo, cols), description.copy()
+		finally:
+			stream.close()
 
 	def writeHeader(self, unit, header, comment='#'):
 		""" Write File Header definition into the opened unit """
@@ -1440,14 +3459,9 @@ class asciiManager(TableManager):
 		for k in keys[1:]: txt+=delimiter+k
 		unit.write(txt+"\n")
 	
-	def writeData(self, data, unit, delimiter=None):
+	def writeData(self, data, unit, delimiter=None, blocksize=50000):
 		""" Write data part into the opened unit """
-		keys = numpy.sort(data.keys())
-		size = numpy.size(data[data.keys()[0]])
-		for ik in range(size):
-			txt = str(data[keys[0]][ik])
-			for k in keys[1:]: txt+=delimiter+str(data[k][ik])
-			unit.write(txt+"\n")
+		_writeTextBlocks(data, unit, delimiter=delimiter, blocksize=blocksize)
 
 	def write(self, data, header=None, output='exportedData.dat', 
 		delimiter=None, comment='#', keep=False, unit = None,
@@ -1472,7 +3486,7 @@ class asciiManager(TableManager):
 		if unit != None:
 			outputFile = unit
 		else:
-			outputFile = open(output, 'w')
+			outputFile = _openFile(output, 'w')
 			if header != None: 
 				self.writeHeader(outputFile, header, comment=comment)
 			self.writeColHeader(data, outputFile, comment=comment)
@@ -1502,14 +3516,10 @@ class latexManager(TableManager):
 	def read(self, filename, *args, **kwargs):
 		pass
 
-	def writeData(self, data, unit, delimiter='&'):
+	def writeData(self, data, unit, delimiter='&', blocksize=50000):
 		""" Write data part into the opened unit """
-		keys = numpy.sort(data.keys())
-		size = numpy.size(data[data.keys()[0]])
-		for ik in range(size):
-			txt = str(data[keys[0]][ik])
-			for k in keys[1:]: txt+=delimiter+str(data[k][ik])
-			unit.write(txt+"\\\\\n")
+		_writeTextBlocks(data, unit, delimiter=delimiter, eol="\\\\\n",
+					blocksize=blocksize)
 
 	def write(self, data, header=None, output='exportedData.tex',
 			units=None, comments=None, verbose=False,
@@ -1531,7 +3541,7 @@ class latexManager(TableManager):
 			unit	  -- uses opened stream, if provided 
 		"""
 		
-		unit = open(output, 'w')
+		unit = _openFile(output, 'w')
 		unit.write('\\begin{table}\n \\begin{center}\n')
 		if 'NAME' in header:
 			unit.write('\\caption{%s}\n' % header['NAME'])
@@ -1576,567 +3586,973 @@ class latexManager(TableManager):
 
 register_extension(latexManager(), 'tex')
 
-try:
-	import pyfits
+#==============================================================================
+# Numpy directory tables
+#==============================================================================
 
-	class fitsManager(TableManager):
+def _jsonValue(val):
+	""" 
+	-- Internal use --
+	Returns a value that can be stored into a JSON header 
+	"""
+	if isinstance(val, numpy.generic):
+		return val.item()
+	if (val is None) or isinstance(val, (bool, int, long, float, str, unicode)):
+		return val
+	return str(val)
 
-		def __init__(self):
-			""" constructor """
-			TableManager.__init__(self, tableType='fits')
+def _fromJson(val):
+	""" 
+	-- Internal use --
+	Converts the unicode strings of a JSON content into strings
+	"""
+	if isinstance(val, unicode):
+		return val.encode('utf-8')
+	if isinstance(val, list):
+		return [ _fromJson(k) for k in val ]
+	if isinstance(val, dict):
+		return dict([ (_fromJson(k), _fromJson(v)) for k, v in val.iteritems() ])
+	return val
+
+class npyManager(TableManager):
+	""" Numpy directory tables (npyd)
+	A table is a directory containing one .npy file per column and a JSON
+	header (header.json) that stores the table header and the column
+	headers (units, descriptions, null, format).
+	Reading memory maps the columns: opening a table only reads the
+	header, the data are read from the disk on access and the memory
+	pages are shared by all the processes that open the same table.
+	"""
+	def __init__(self):
+		""" constructor """
+		TableManager.__init__(self, tableType='npyd')
+		self.headerFile = 'header.json'
 
-		def _getFitsFmt(self, val):
-			"""
-			-- Internal use -- 
-			return the format string to use while defining
-			the fits table column.
-			input:
-				val -- column of values to define
-			outputs:
-				type -- the character definition associated
-			"""
-			t = type(val[0])
-			if (t == numpy.int) | (t == numpy.int8)| (t == numpy.int16)| (t == numpy.int32):
-				return('D')
-			elif (t == numpy.float) | (t == numpy.float32)|(t == numpy.float64):
-				return('F')
-			elif (t == numpy.str) | (isinstance(val[0], str)):
-				_len = numpy.max([len(k) for k in val])
-				return(str(_len)+'A')
-			elif t == numpy.short:
-				return('I')
-			elif (t == numpy.int32) | (t == numpy.int64):
-				return('F')
-			else:
-				print "WARNING: type conversion not found", t
-
-		def readHeader(self, hdu):
-			header = TableHeader()
-			genTerms = [ 'XTENSION', 'BITPIX', 'NAXIS', 'NAXIS1',
-				     'NAXIS2', 'PCOUNT', 'GCOUNT', 'TFIELDS'  ]
-			fieldTerms = ['TTYPE', 'TFORM', 'TUNIT']
-			for k in hdu.header:
-				if (not k in genTerms) & (not k[:5] in fieldTerms):
-					header[k] = hdu.header[k]
-			if 'EXTNAME' in hdu.header:
-				header['NAME'] =  hdu.header['EXTNAME']
-			return header
-
-		def _readColComments(self, card):
-			ttype =  str(card).split('/')
-			if len(ttype) > 1:
-				return ' '.join(ttype[-1].split())
-			else:
-				return None
-			
-		def readData(self, hdu):
-			colDef = hdu.columns
-			names = [ k.name for k in colDef ]
-			units = [ k.unit for k in colDef ]
-			#comms = [ k.comment for k in colDef ]
-			comms = [ self._readColComments(k) for k in hdu.header.ascard['TTYPE*'] ]
-			data  = [ TableColumn(hdu.data.field(names[k]), \
-						name=names[k], \
-						unit=units[k], \
-						description=comms[k] )\
-						for k in range(len(names)) ]
-			return data	
-
-		def read(self, filename, extension = 1, **kwargs):
-			hdu = pyfits.open(filename)
-			header = self.readHeader(hdu[extension])	
-			data   = self.readData(hdu[extension])
-			hdu.close()
-			return data, header
+	def _colFileName(self, name, used):
+		""" 
+		-- Internal use --
+		returns a unique file name for a given column 
+		"""
+		fname = re.sub('[^A-Za-z0-9_.+-]', '_', str(name)) or 'col'
+		if fname.lower() in used:
+			i = 1
+			while ('%s_%d' % (fname, i)).lower() in used:
+				i += 1
+			fname = '%s_%d' % (fname, i)
+		used.add(fname.lower())
+		return fname + '.npy'
+
+	def readHeader(self, filename):
+		""" returns the content of the JSON header of a table directory """
+		f = open(os.path.join(filename, self.headerFile), 'r')
+		try:
+			return _fromJson(json.load(f))
+		finally:
+			f.close()
 
-		def writeColComment(self, header, colName, comment):
-			cards = header.ascard['TTYPE*']
-			refs = {}
-			for k in cards: refs[k.value] = k.key
-			header.update(refs[colName], colName, comment=comment) 
+	def read(self, filename, mmap_mode='r', columns=None, **kwargs):
+		"""
+		read a numpy directory table
+		inputs:
+			filename -- directory to read from
+		keywords:
+			mmap_mode -- memory mapping mode of the columns
+				     (see numpy.load: 'r', 'r+', 'c' or None)
+				     'r' (def) returns read-only views of the
+				     files, None reads the data into memory.
+			columns   -- only read these columns
+		"""
+		info = self.readHeader(filename)
+		header = TableHeader(info['header'])
+		data = []
+		indexes = {}
+		for cInfo in info['columns']:
+			if (columns is not None) and (not cInfo['name'] in columns):
+				continue
+			arr = numpy.load(os.path.join(filename, cInfo['file']), 
+						mmap_mode=mmap_mode)
+			col = arr.view(TableColumn)
+			col.header = TableColumnHeader(cInfo['name'], arr.dtype, 
+					cInfo['unit'], cInfo['description'],
+					cInfo['null'], cInfo['format'])
+			data.append(col)
+			if 'index' in cInfo:
+				indexes[cInfo['name']] = numpy.load(os.path.join(filename, 
+						cInfo['index']), mmap_mode=mmap_mode)
+		header['_sourceTable'] = filename
+		if len(indexes) > 0:
+			header['_indexes'] = indexes
+		return data, header
+
+	def _writeHeader(self, filename, info):
+		""" -- Internal use -- writes the JSON header of a table directory """
+		f = open(os.path.join(filename, self.headerFile), 'w')
+		try:
+			json.dump(info, f, indent=1)
+		finally:
+			f.close()
+
+	def createIndex(self, table, name, index):
+		""" stores the index of a column (sorting permutation) into the
+		indexes sub-directory of the table directory """
+		filename = table.sourceTable
+		try:
+			info = self.readHeader(filename)
+			for cInfo in info['columns']:
+				if cInfo['name'] == name:
+					if not os.path.isdir(os.path.join(filename, 'indexes')):
+						os.makedirs(os.path.join(filename, 'indexes'))
+					cInfo['index'] = os.path.join('indexes', cInfo['file'])
+					numpy.save(os.path.join(filename, cInfo['index']), 
+							numpy.asarray(index.order))
+					self._writeHeader(filename, info)
+		except (IOError, OSError), e:
+			warnings.warn("Index of %s could not be stored: %s" % (name, e))
+
+	def write(self, data, header=None, output='exportedData.npyd', 
+			units=None, comments=None, clobber=False, silent=False,
+			**kwargs):
+		"""
+		export data to a numpy directory table
 
-		def write(self, data, header=None, output='exportedData.fits', fmt=None,
-			name=None, comments=None, units=None, clobber=False, append=True, global_attrs=None,
-			silent=False, hdr_only = False, keep_open = False, hdr0 = None):
-			"""
-			export data to a FITS file
+		inputs:
+			data -- data dictionnary to export
+		
+		outputs:
+			output -- output directory (def: exportedData.npyd)
 
-			inputs:
-				data -- data dictionnary to export
-			
-			outputs:
-				output -- output file (def: exportedData.dat)
+		keywords:
+			header   -- table header (TableHeader or dict) 
+			units    -- list of units (used for columns without header)
+			comments -- list of comments (used for columns without header)
+			clobber  -- overwrite an existing table 
+			silent   -- Do not print any message when set
+		"""
+		if os.path.exists(os.path.join(output, self.headerFile)):
+			if not clobber:
+				raise Exception("Table %s already exists" % output)
+			for cInfo in self.readHeader(output)['columns']:
+				for fname in [ cInfo['file'], cInfo.get('index', None) ]:
+					if (fname is not None) and os.path.exists(os.path.join(output, fname)):
+						os.remove(os.path.join(output, fname))
+			os.remove(os.path.join(output, self.headerFile))
+		elif not os.path.isdir(output):
+			os.makedirs(output)
+
+		keys = data.keys()
+		if (units is None) or (len(units) != len(keys)):
+			units = [None] * len(keys)
+		if (comments is None) or (len(comments) != len(keys)):
+			comments = [None] * len(keys)
+
+		used = set([self.headerFile.split('.')[0]])
+		cInfos = []
+		for i, k in enumerate(keys):
+			col = numpy.asarray(data[k])
+			if col.dtype.kind == 'O':
+				#memory mapping requires fixed size types
+				col = numpy.asarray(col.tolist())
+				if col.dtype.kind == 'O':
+					raise Exception("Column %s cannot be stored (object type)" % k)
+			hdr = getattr(data[k], 'header', None)
+			if hdr is None:
+				hdr = TableColumnHeader(k, col.dtype, units[i], comments[i])
+			fname = self._colFileName(k, used)
+			numpy.save(os.path.join(output, fname), col)
+			cInfos.append( { 'name': k, 'file': fname, 
+					'dtype': col.dtype.str,
+					'unit': _jsonValue(hdr['unit']),
+					'description': _jsonValue(hdr['description']),
+					'null': _jsonValue(hdr['null']),
+					'format': _jsonValue(hdr['format']) } )
+
+		hdr = {}
+		if header is not None:
+			for k, v in header.iteritems():
+				if k[0] != '_':
+					hdr[k] = _jsonValue(v)
+		#header is written last: the table is only valid when complete
+		self._writeHeader(output, {'header': hdr, 'columns': cInfos})
+		if not silent:
+			print "Data exported into %s" % output
+
+register_extension(npyManager(), 'npyd')
 
-			keywords:
-				fmt     -- force a given column format 
-				             (alphabetic data name order)
-				name    -- extention name of the fits file (def: DATA)
-				header  -- dictonnary of keywords and corresponding 
-					   values
-				comments-- list of column comments
-				units   -- list of column units
-				global_attrs   -- dictonnary of keywords to add to the
-						  main container. (or update; No need
-						  to include other keywords to do so.)
-				clobber -- overwrite if set (def: False)
-				append  -- add data to existing file (def: True)
-			"""
-			if (not os.path.isfile(output)) & append: 
-				if not silent: 
-					print "Warning: %s does not seem to exist" % output
-					print "         Creating a new file."
-				append=False	
-
-			if data != None:
-				keys = data.keys()
-				indkeys = numpy.argsort(data.keys())
-				if fmt == None:
-					fmt = [ self._getFitsFmt(data[k]) for k in keys ]
-				if (comments == None) | len(comments) != len(data) :
-					comments = [None]*len(data)	
-				if (units == None) | len(units) != len(data) :
-					units = [None]*len(data)	
-				cols = [ pyfits.Column( name=keys[ik],        \
-							array=data[keys[ik]], \
-							format=fmt[ik],       \
-							unit=units[ik]      ) \
-							for ik in indkeys  ]
-				hdr = pyfits.new_table(cols)
-				hdr.header.update('EXTNAME', name or header['NAME'])
-				hdr.header.update('FILENAME', output.split('/')[-1])
-				if header != None:
-					for k in header:
-						if (k != 'COMMENT') & (k != 'HISTORY'):
-							hdr.header.update(k, header[k])	
-						else:
-							txt = header[k].split('\n')
-							for j in txt:
-								if k == 'COMMENT':
-									hdr.header.add_comment(j)	
-								elif k == 'HISTORY':
-									hdr.header.add_history(j)	
-				for ik in range(len(keys)):
-					if comments[ik] != None:
-						self.writeColComment(hdr.header, keys[ik], comments[ik])
-				if hdr_only:
-					return hdr
-
-				if not append:
-					hdr.writeto(output,clobber=clobber)
-					if not silent: 
-						print "Data exported into %s" % output
-				else:
-					if hdr0 == None:
-						retHdr = True
-						hdr0 = pyfits.open(output, mode='append')
-					else:
-						retHdr = False
+#==============================================================================
+# Parse cache of text tables
+#==============================================================================
 
-					hdr0.append(hdr)
-					if not keep_open:
-						hdr0.flush()
-						hdr0.close()
-					else:
-						if retHdr: return hdr0
-					if not silent: 
-						print "Data added into %s" % output
+_parseCache = { 'directory': None, 'maxsize': 10 * 1024 ** 3 }
 
-			if global_attrs != None: 
-				if hdr0 == None:
-					hdr0 = pyfits.open(output, mode='update')
-				for k in global_attrs:
-					hdr0[0].header.update(k, global_attrs[k])	
-				hdr0.flush()
-				hdr0.close()
-				if not silent: 
-					print "Keywords added to main table into %s" % output
+def enableCache(directory='~/.mytables_cache', maxsize=10 * 1024 ** 3):
+	""" Enables the parse cache of the text tables (csv, ascii)
+	Once a text file is parsed, its columns are stored as a numpy
+	directory table (npyd) in the cache directory, the next reads of the
+	same unchanged file (path, size and modification time) memory map
+	the cached columns instead of parsing the file again.
+	inputs:
+		directory -- cache directory (created if needed)
+		maxsize   -- maximum total size of the cache in bytes, the least
+			     recently used entries are evicted above it
+			     (None: unlimited)
+	"""
+	directory = os.path.realpath(os.path.expanduser(directory))
+	if not os.path.isdir(directory):
+		os.makedirs(directory)
+	_parseCache['directory'] = directory
+	_parseCache['maxsize'] = maxsize
+
+def disableCache():
+	""" Disables the parse cache (the cached entries are kept on disk) """
+	_parseCache['directory'] = None
+
+def invalidateCache(filename=None):
+	""" Removes the cached entries of a given file 
+	inputs:
+		filename -- source file, all the entries are removed if None
+	outputs:
+		number of removed entries
+	"""
+	directory = _parseCache['directory']
+	if (directory is None) or (not os.path.isdir(directory)):
+		return 0
+	if filename is None:
+		prefix = ''
+	else:
+		prefix = _cacheKey(filename)[0]
+	n = 0
+	for entry in os.listdir(directory):
+		if entry.startswith(prefix) and entry.endswith('.npyd'):
+			shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+			n += 1
+	return n
+
+def _cacheKey(filename, manager=None, kwargs={}):
+	""" 
+	-- Internal use --
+	returns the (path, version, options) keys of a cache entry: they
+	depend on the path, on the size and modification time of the file and
+	on the parsing options respectively
+	"""
+	path = os.path.realpath(filename)
+	pKey = hashlib.sha1(path).hexdigest()[:16]
+	if manager is None:
+		return pKey, None, None
+	st = os.stat(path)
+	vKey = hashlib.sha1('%d|%r' % (st.st_size, st.st_mtime)).hexdigest()[:8]
+	opts = repr(sorted([ (k, repr(v)) for k, v in kwargs.iteritems() \
+			if k != 'processes' ]))
+	oKey = hashlib.sha1('%s|%s' % (manager.tableType, opts)).hexdigest()[:8]
+	return pKey, vKey, oKey
+
+def _cacheSize(entry):
+	""" -- Internal use -- returns the size of a cache entry in bytes """
+	size = 0
+	for root, dirs, files in os.walk(entry):
+		for f in files:
+			size += os.path.getsize(os.path.join(root, f))
+	return size
+
+def _cacheEvict(directory, maxsize):
+	""" 
+	-- Internal use --
+	removes the least recently used entries until the cache is smaller
+	than maxsize 
+	"""
+	if maxsize is None:
+		return
+	entries = []
+	for entry in os.listdir(directory):
+		path = os.path.join(directory, entry)
+		if entry.endswith('.npyd') and os.path.isdir(path):
+			entries.append( (os.path.getmtime(path), _cacheSize(path), path) )
+	entries.sort()
+	total = sum([ e[1] for e in entries ])
+	for mtime, size, path in entries:
+		if total <= maxsize:
+			break
+		shutil.rmtree(path, ignore_errors=True)
+		total -= size
+
+def _cacheRead(filename, manager, kwargs):
+	""" 
+	-- Internal use --
+	returns the (data, description) of a cached file or None if the file
+	is not in the cache. Columns are copy-on-write memory maps: they can
+	be modified like parsed columns without changing the cache entry.
+	"""
+	entry = os.path.join(_parseCache['directory'], 
+			'%s_%s_%s.npyd' % _cacheKey(filename, manager, kwargs))
+	if not os.path.exists(os.path.join(entry, 'header.json')):
+		return None
+	try:
+		data, description = npyManager().read(entry, mmap_mode='c')
+	except (IOError, OSError, ValueError, KeyError):
+		return None
+	#mark the entry as recently used
+	os.utime(entry, None)
+	#the table is not attached to the cache entry
+	for k in ['_sourceTable', '_indexes']:
+		if k in description:
+			description.pop(k)
+	return data, description
+
+def _cacheWrite(filename, manager, kwargs, data, description):
+	""" 
+	-- Internal use --
+	stores the parsed columns of a file into the cache
+	the entry is written into a temporary directory and renamed when
+	complete so that concurrent readers never see partial entries
+	"""
+	directory = _parseCache['directory']
+	pKey, vKey, oKey = _cacheKey(filename, manager, kwargs)
+	entry = os.path.join(directory, '%s_%s_%s.npyd' % (pKey, vKey, oKey))
+	if isinstance(data, dict):
+		cols = data
+	else:
+		cols = dict([ (k.header.name, k) for k in data ])
+	#entries of previous versions of the file are outdated
+	#(entries of the current version with other options are kept)
+	for name in os.listdir(directory):
+		if name.startswith(pKey + '_') and name.endswith('.npyd') and \
+				(not name.startswith('%s_%s_' % (pKey, vKey))):
+			shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+	tmp = '%s.%d.tmp' % (entry, os.getpid())
+	try:
+		npyManager().write(cols, header=description, output=tmp, 
+				clobber=True, silent=True)
+		os.rename(tmp, entry)
+	except Exception, e:
+		shutil.rmtree(tmp, ignore_errors=True)
+		warnings.warn("%s could not be cached: %s" % (filename, e))
+		return
+	_cacheEvict(directory, _parseCache['maxsize'])
 
-	register_extension(fitsManager(), 'fits')
+#==============================================================================
+# Chunked compressed columnar tables
+#==============================================================================
+import zlib, struct
 
-except ImportError:
-	print "Warning: FITS files could not be managed."
+def _chunkStats(arr, null=None):
+	""" 
+	-- Internal use --
+	returns the (min, max, null count) statistics of a chunk of a column
+	NaN values and values equal to null are counted as null values, NaN
+	values are excluded from min/max.
+	"""
+	arr = numpy.asarray(arr)
+	kind = arr.dtype.kind
+	if not kind in 'biufSU':
+		return None, None, None
+	if kind == 'f':
+		bad = numpy.isnan(arr)
+		nnull = int(bad.sum())
+		valid = arr[~bad]
+	else:
+		nnull = 0
+		valid = arr.ravel()
+	if (null is not None) and (not (isinstance(null, float) and numpy.isnan(null))):
+		try:
+			nnull += int(numpy.sum(valid == null))
+		except TypeError:
+			pass
+	if valid.size == 0:
+		return None, None, nnull
+	if kind in 'SU':
+		valid = numpy.sort(valid)
+		return _jsonValue(valid[0]), _jsonValue(valid[-1]), nnull
+	return _jsonValue(valid.min()), _jsonValue(valid.max()), nnull
+
+class ctabManager(TableManager):
+	""" Chunked compressed columnar tables (ctab)
+	Each column is split into chunks of rows that are compressed
+	independently (zlib or lzma) and stored one column after the other.
+	The file ends with a JSON footer that stores the table header, the
+	column headers, the position of every chunk and per-chunk statistics
+	(min, max and null count).
+
+	where/selectWhere on tables read from ctab files use these statistics
+	(zone maps) to skip the chunks that cannot contain matching rows: only
+	the remaining chunks are read and decompressed (in parallel threads).
+	"""
+	magic = 'MYTCTAB1'
 
-try:
-	import tables
-	class hd5Manager(TableManager):
+	def __init__(self):
+		""" constructor """
+		TableManager.__init__(self, tableType='ctab')
+		self.compressors = { 'none': (lambda b, level: b, lambda b: b),
+			'zlib': (lambda b, level: zlib.compress(b, level), zlib.decompress) }
+		if lzma is not None:
+			self.compressors['lzma'] = (lambda b, level: lzma.compress(b, preset=level), 
+							lzma.decompress)
+
+	def readFooter(self, filename):
+		""" returns the description of the table stored at the end of the file """
+		f = open(filename, 'rb')
+		try:
+			n = len(self.magic)
+			if f.read(n) != self.magic:
+				raise Exception("%s is not a ctab file" % filename)
+			f.seek(-(n + 8), 2)
+			size = struct.unpack('<Q', f.read(8))[0]
+			if f.read(n) != self.magic:
+				raise Exception("%s is truncated" % filename)
+			f.seek(-(n + 8 + size), 2)
+			info = _fromJson(json.loads(f.read(size)))
+		finally:
+			f.close()
+		info['filename'] = filename
+		return info
+
+	def _chunkRows(self, info, i):
+		""" -- Internal use -- returns the row range of chunk i """
+		i0 = i * info['chunksize']
+		return i0, min(i0 + info['chunksize'], info['nrows'])
+
+	def readChunks(self, info, names, chunks, threads=None):
+		""" 
+		read and decompress chunks of columns
+		inputs:
+			info   -- table description (see readFooter)
+			names  -- columns to read
+			chunks -- indices of the chunks to read
+		keywords:
+			threads -- number of decompression threads
+		outputs:
+			dictionary of the list of chunk arrays of each column
+		"""
+		cols = dict([ (c['name'], c) for c in info['columns'] ])
+		decompress = self.compressors[info['compression']][1]
+		f = open(info['filename'], 'rb')
+		raw = []
+		try:
+			for name in names:
+				for i in chunks:
+					offset, nbytes = cols[name]['chunks'][i]
+					f.seek(offset)
+					raw.append((name, f.read(nbytes)))
+		finally:
+			f.close()
+
+		def decode(item):
+			name, buf = item
+			c = cols[name]
+			arr = numpy.frombuffer(decompress(buf), dtype=numpy.dtype(c['dtype']))
+			return arr.reshape((-1,) + tuple(c['shape']))
+
+		arrs = _threadMap(decode, raw, threads)
+		n = len(chunks)
+		return dict([ (name, arrs[k * n:(k + 1) * n]) for k, name in enumerate(names) ])
+
+	def readCol(self, info, name, threads=None):
+		""" read a full column """
+		c = [ k for k in info['columns'] if k['name'] == name ][0]
+		nchunks = len(c['chunks'])
+		chunks = self.readChunks(info, [name], range(nchunks), threads)[name]
+		out = numpy.empty((info['nrows'],) + tuple(c['shape']), dtype=numpy.dtype(c['dtype']))
+		for i in range(nchunks):
+			i0, i1 = self._chunkRows(info, i)
+			out[i0:i1] = chunks[i]
+		return out
+
+	def _readColProxy(self, info, c, threads=None):
+		""" 
+		-- Internal use -- 
+		returns a TableColumnProxy that reads the column on demand
+		"""
+		header = TableColumnHeader(c['name'], numpy.dtype(c['dtype']), c['unit'], 
+				c['description'], c['null'], c['format'])
+		return TableColumnProxy(lambda: self.readCol(info, c['name'], threads),
+				header, (info['nrows'],) + tuple(c['shape']))
 
-			def __init__(self):
-				""" constructor """
-				TableManager.__init__(self, tableType='hd5')
+	def read(self, filename, lazy=True, columns=None, threads=None, **kwargs):
+		"""
+		read a ctab file
+		inputs:
+			filename -- file to read from
+		keywords:
+			lazy    -- the columns are only read on first access (def),
+				   so that where/selectWhere skip chunks
+			columns -- only read these columns
+			threads -- number of decompression threads 
+				   (def: number of cpus)
+		"""
+		info = self.readFooter(filename)
+		header = TableHeader(info['header'])
+		data = []
+		for c in info['columns']:
+			if (columns is not None) and (not c['name'] in columns):
+				continue
+			proxy = self._readColProxy(info, c, threads)
+			if lazy:
+				data.append(proxy)
+			else:
+				data.append(proxy.load())
+		info['threads'] = threads
+		header['_sourceTable'] = info
+		return data, header
+
+	def _whereChunks(self, table, condition, condvars=None, fields=(),
+			start=None, stop=None, step=None):
+		""" 
+		-- Internal use --
+		Evaluates the condition on the chunks of the file that may
+		contain matching rows (zone maps).
+		outputs:
+			(chunk indices, row masks, chunk data) or None if the
+			condition cannot be evaluated from the file
+		"""
+		if (start != None) | (stop != None) | (step != None):
+			return None
+		cond = _translateCondition(condition, table._sourceCols, condvars)
+		if cond == None:
+			return None
+		names = [ k for k in compileExpr(cond[0]).names if k in table._sourceCols ]
+		if len(names) == 0:
+			return None
+		if self._loaded(table, condition, fields):
+			#data in memory (possibly modified)
+			return None
+		info = table.sourceTable
+		cols = dict([ (c['name'], c) for c in info['columns'] ])
+		nchunks = len(info['columns'][0]['chunks'])
+		zones = dict([ (k, (cols[k]['min'], cols[k]['max'], cols[k]['nnull'])) for k in names ])
+		keep = numpy.where(_zoneFilter(condition, zones, nchunks, condvars))[0]
+		names += [ k for k in fields if not k in names ]
+		data = self.readChunks(info, names, keep, info.get('threads', None))
+		expr = compileExpr(cond[0])
+		masks = []
+		for j, i in enumerate(keep):
+			i0, i1 = self._chunkRows(info, i)
+			m = expr.evaluate(dict([ (k, data[k][j]) for k in names ]), i1 - i0, cond[1])
+			m = numpy.asarray(m, dtype=bool)
+			if m.ndim == 0:
+				m = numpy.repeat(m, i1 - i0)
+			masks.append(m)
+		return keep, masks, data
+
+	def getWhereList(self, table, condition, condvars=None, 
+			start=None, stop=None, step=None):
+		""" Returns the indices of the rows of the file fulfilling the
+		condition (only reading the chunks that may match) or None if
+		the condition cannot be evaluated from the file """
+		r = self._whereChunks(table, condition, condvars, 
+				start=start, stop=stop, step=step)
+		if r == None:
+			return None
+		keep, masks, data = r
+		ind = [ numpy.where(m)[0] + self._chunkRows(table.sourceTable, i)[0] \
+				for i, m in zip(keep, masks) ]
+		return numpy.concatenate([ numpy.zeros(0, dtype=int) ] + ind)
+
+	def readWhere(self, table, condition, condvars=None, fields=None,
+			start=None, stop=None, step=None):
+		""" Returns the columns of the rows of the file fulfilling the
+		condition (only reading the chunks that may match) or None if
+		the condition cannot be evaluated from the file """
+		if fields == None:
+			fields = table.keys()
+		if not set(fields).issubset(table._sourceCols):
+			return None
+		r = self._whereChunks(table, condition, condvars, fields,
+				start=start, stop=stop, step=step)
+		if r == None:
+			return None
+		keep, masks, chunks = r
+		cols = dict([ (c['name'], c) for c in table.sourceTable['columns'] ])
+		data = []
+		for k in fields:
+			c = cols[k]
+			empty = numpy.zeros((0,) + tuple(c['shape']), dtype=numpy.dtype(c['dtype']))
+			col = TableColumn(numpy.concatenate([empty] + \
+				[ chunks[k][j][m] for j, m in enumerate(masks) ]))
+			col.header = table.getColHeader(k).copy()
+			data.append(col)
+		return data
+
+	def write(self, data, header=None, output='exportedData.ctab', 
+			units=None, comments=None, chunksize=65536, 
+			compression='zlib', level=6, threads=None, silent=False,
+			**kwargs):
+		"""
+		export data to a ctab file
 
+		inputs:
+			data -- data dictionnary to export
+		
+		outputs:
+			output -- output file (def: exportedData.ctab)
 
-			def _getValClass(self, val):
-				try:
-					t = type(val[0])
-				except:
-					t = type(val)
-				if (t == numpy.str) | (t==numpy.string_):
-					return('StringCol')
-				else:
-					t = type(numpy.max(val))
-					if t == numpy.int:
-						return('IntCol')
-					elif (t == numpy.float):
-						return('FloatCol')
-					elif (t == numpy.bool):
-						return('BoolCol')
-					elif (t == numpy.complex):
-						return('ComplexCol')
-					elif (t == numpy.float32):
-						return('Float32Col')
-					elif (t == numpy.float64):
-						return('Float64Col')
-					elif (t == numpy.short) | (t == numpy.int8):
-						return('Int8Col')
-					elif (t == numpy.int16):
-						return('Int16Col')
-					elif (t == numpy.int32):
-						return('Int32Col')
-					elif (t == numpy.int64):
-						return('Int64Col')
-					else:
-						print "Warning: type unknown!", t
-
-			def _getExtendedFmt(self, val, pos=0):
-				"""
-				return the format string to use while defining
-				the pyTable description class.
-				In this context, this has been extended to account for
-				multidimentional values.
-				input:
-					val -- column of values to define
-					pos -- position of the column (def: 0)
-				outputs:
-					type -- the string declaration
-				"""
-				if (not _isiterable(val[0])) :
-					return self._getHD5Fmt(val,pos=pos)
-				else:
-					_val = val[0]
-					s = numpy.shape(_val)
-					_class = self._getValClass(_val)
-					_args = ""
-					if _class == 'StringCol':
-						_len = numpy.max([len(k) for k in _val])
-						_args = str(_len)
-					_args += 'shape='+str(s)+',pos='+str(pos)
-					return(_class+'('+_args+')')
-
-			def _getHD5Fmt(self, val, pos=0):
-				"""
-				-- Internal use -- 
-				return the format string to use while defining
-				the pyTable description class.
-				input:
-					val -- column of values to define
-					pos -- position of the column (def: 0)
-				outputs:
-					type -- the string declaration
-				"""
-				try:
-					t = type(val[0])
-				except:
-					t = type(val)
-				if (t == numpy.str) | (t==numpy.string_):
-					_len = numpy.max([len(k) for k in val])
-					return('StringCol('+str(_len)+",pos="+str(pos)+')')
-				else:
-					t = type(numpy.max(val[:]))
-					if t == numpy.int:
-						return('IntCol(pos='+str(pos)+')')
-					elif (t == numpy.float):
-						return('FloatCol(pos='+str(pos)+')')
-					elif (t == numpy.bool):
-						return('BoolCol(pos='+str(pos)+')')
-					elif (t == numpy.complex):
-						return('ComplexCol(pos='+str(pos)+')')
-					elif (t == numpy.float32):
-						return('Float32Col(pos='+str(pos)+')')
-					elif (t == numpy.float64):
-						return('Float64Col(pos='+str(pos)+')')
-					elif (t == numpy.short) | (t == numpy.int8):
-						return('Int8Col(pos='+str(pos)+')')
-					elif (t == numpy.int16):
-						return('Int16Col(pos='+str(pos)+')')
-					elif (t == numpy.int32):
-						return('Int32Col(pos='+str(pos)+')')
-					elif (t == numpy.int64):
-						return('Int64Col(pos='+str(pos)+')')
-					else:
-						print "Warning: type unknown!", t
-			
-			def readColDesc(self, tab, name):
-				key = [ k for k in tab.attrs._v_attrnames \
-						if tab.attrs[k] == name ]
+		keywords:
+			header      -- table header (TableHeader or dict) 
+			units       -- list of units (used for columns without header)
+			comments    -- list of comments (used for columns without header)
+			chunksize   -- number of rows per chunk
+			compression -- 'zlib' (def), 'lzma' (if available) or 'none'
+			level       -- compression level
+			threads     -- number of compression threads 
+			silent      -- Do not print any message when set
+		"""
+		if not compression in self.compressors:
+			raise Exception("Compression %s is not available" % compression)
+		compress = self.compressors[compression][0]
+		keys = data.keys()
+		if (units is None) or (len(units) != len(keys)):
+			units = [None] * len(keys)
+		if (comments is None) or (len(comments) != len(keys)):
+			comments = [None] * len(keys)
+		nrows = 0
+		if len(keys) > 0:
+			nrows = len(data[keys[0]])
+		chunksize = int(chunksize)
+		bounds = [ (i0, min(i0 + chunksize, nrows)) for i0 in range(0, nrows, chunksize) ]
 
-				key = key[0].replace('NAME', '')
-				if key+'UNIT' in tab.attrs: 
-					unit = tab.attrs[key+'UNIT']
-				else: 
-					unit = None
-				if key+'DESC' in tab.attrs: 
-					desc = tab.attrs[key+'DESC']
-				else:
-					desc = None
-				return (unit, desc)
-
-			def readCol(self, tab, colName):
-					cunit, cdesc = self.readColDesc(tab, colName)	
-					return TableColumn(tab.col(colName), 
-								name = colName, 
-								unit=cunit,
-								description=cdesc)
-			def readTabHeader(self, tab):
-				head = TableHeader()
-				exclude = ['NROWS', 'VERSION', 'CLASS', 'EXTNAME']
-				for k in tab.attrs._v_attrnames:
-					if (not k in exclude) & (k[:5] != 'FIELD'):
-						head[k] = tab.attrs[k]
-				return head
-
-			def read(self, filename, tableName=None, silent=False, *args, **kwargs):
-				source = tables.openFile(filename, *args, **kwargs)
-				if 'tablename' in kwargs:
-					tableName = kwargs['tablename']
-				if tableName == None:
-					node = source.listNodes('/')[0]
-					tableName = node.name
-				else:
-					if tableName[0] != '/': tableName = '/'+tableName
-					node = source.getNode(tableName)
-				if not silent:
-					print "\tLoading table: %s" % tableName
-				data = [self.readCol(node, k) for k in node.colnames]
-				head = self.readTabHeader(node)
-				head['_sourceFile'] = source
-				if 'NAME' not in head or head['NAME']=='Noname' or head['NAME'] == None: 
-					head['NAME'] = tableName
-				if 'TITLE' not in head or head['TITLE']=='': 
-					head['TITLE'] = node.title
-				return data, head
-			
-			def writeColDesc(self, tab, name, unit=None, desc=None):
-				key = [ k for k in tab.attrs._v_attrnames \
-						if tab.attrs[k] == name ]
+		f = open(output, 'wb')
+		try:
+			f.write(self.magic)
+			cInfos = []
+			for i, k in enumerate(keys):
+				col = numpy.asarray(data[k])
+				if col.dtype.kind == 'O':
+					col = numpy.asarray(col.tolist())
+					if col.dtype.kind == 'O':
+						raise Exception("Column %s cannot be stored (object type)" % k)
+				hdr = getattr(data[k], 'header', None)
+				if hdr is None:
+					hdr = TableColumnHeader(k, col.dtype, units[i], comments[i])
+				pack = lambda b: compress(numpy.ascontiguousarray(col[b[0]:b[1]]).tostring(), level)
+				bufs = _threadMap(pack, bounds, threads)
+				stats = [ _chunkStats(col[i0:i1], hdr['null']) for i0, i1 in bounds ]
+				chunks = []
+				for buf in bufs:
+					chunks.append((f.tell(), len(buf)))
+					f.write(buf)
+				cInfos.append( { 'name': k, 'dtype': col.dtype.str, 
+						'shape': list(col.shape[1:]),
+						'unit': _jsonValue(hdr['unit']),
+						'description': _jsonValue(hdr['description']),
+						'null': _jsonValue(hdr['null']),
+						'format': _jsonValue(hdr['format']),
+						'chunks': chunks,
+						'min': [ st[0] for st in stats ],
+						'max': [ st[1] for st in stats ],
+						'nnull': [ st[2] for st in stats ] } )
+			hdr = {}
+			if header is not None:
+				for k, v in header.iteritems():
+					if k[0] != '_':
+						hdr[k] = _jsonValue(v)
+			footer = json.dumps({ 'header': hdr, 'columns': cInfos,
+				'nrows': nrows, 'chunksize': chunksize,
+				'compression': compression })
+			f.write(footer)
+			f.write(struct.pack('<Q', len(footer)))
+			f.write(self.magic)
+		finally:
+			f.close()
+		if not silent:
+			print "Data exported into %s" % output
+
+register_extension(ctabManager(), 'ctab')
+
+
+class fitsManager(TableManager):
 
-				key = key[0].replace('NAME', '')
-				tab.attrs[key+'UNIT'] = unit
-				tab.attrs[key+'DESC'] = desc
-				
-				
-			def write(self, data, header=None,
-					output='exportedData.hd5', tablename='data', 
-					mode='w', group='/', silent=False,
-					units=None, comments=None,
-					appendTable=False, **kwargs):
-				"""
-				export data to a HDF5 file
-
-				inputs:
-					data -- data dictionnary to export
-				
-				outputs:
-					output -- output file (def: exportedData.dat)
-
-				keywords:
-					tablename -- table name to create/modify (def: 'data')
-					mode      -- 'w' will create a brand new file (default)
-						     'a' will append an existing file (useful to add
-						     tables in an existing file)
-					group     -- path to the table (def: '/') 
-					header    -- Dictionnary of attributes to add to the table
-					silent    -- Do not print any message when set
-				"""
-				if header != None:
-					if 'NAME' in header:
-						tablename = header['NAME'].replace('.','_')
-				if (comments == None) | len(comments) != len(data) :
-					comments = [None]*len(data)	
-				if (units == None) | len(units) != len(data) :
-					units = [None]*len(data)	
-
-				keys = data.keys()
-				keys.sort()
-				if appendTable == True:
-					mode = 'a'
-				if mode == 'w':
-					hd5 = tables.openFile(output,mode=mode)
-				else:
-					hd5 = tables.openFile(output, mode=mode)
+	def __init__(self):
+		""" constructor """
+		TableManager.__init__(self, tableType='fits', requires=['pyfits'])
 
-				#Gen the Table Colum def class
-				if not appendTable:
-					code = 'class newTable(tables.IsDescription):'
-					pos = 0
-					for k in keys:
-						ktype = self._getExtendedFmt(data[k], pos)
-						code +="\n\t"+ k + "= tables." + ktype 
-						pos += 1
-					# generate a table data class associated to data
-					exec(code)	
-					try:
-						if group[-1] == '/':
-							group = group[:-1]
-						table = hd5.createTable(group, tablename, newTable, expectedrows = numpy.size(data[keys[0]]), createparents=True)
-						hd5.flush()
-					except:
-						if not silent:
-							print "Warning: Table creation exception. Table may already exist."
-						table = hd5.getNode(group+tablename)
-				else:
-					try:
-						table = hd5.getNode(group+tablename)
-					except tables.NoSuchNodeError:
-						code = 'class newTable(tables.IsDescription):'
-						pos = 0
-						for k in keys:
-							ktype = self._getExtendedFmt(data[k], pos)
-							code +="\n\t"+ k + "= tables." + ktype 
-							pos += 1
-						# generate a table data class associated to data
-						exec(code)	
-						if group[-1] == '/':
-							group = group[:-1]
-						table = hd5.createTable(group, tablename, newTable, expectedrows = numpy.size(data[keys[0]]), createparents=True)
-						hd5.flush()
-					
-				row = table.row
-				for i in range(numpy.size(data[keys[0]])):
-					for k in keys:
-						row[k] = data[k][i]
-					row.append()
-				table.flush()
-				if header != None:
-					for k in header:
-						table.attrs[k] = header[k]
-					if not 'TITLE' in header:
-						table.attrs['TITLE'] = tablename
-				
-				for ik in range(len(keys)):
-					self.writeColDesc(table, keys[ik], units[ik], comments[ik])
+	def _getFitsFmt(self, val):
+		"""
+		-- Internal use -- 
+		return the format string to use while defining
+		the fits table column.
+		input:
+			val -- column of values to define
+		outputs:
+			type -- the character definition associated
+		"""
+		t = type(val[0])
+		if (t == numpy.int) | (t == numpy.int8)| (t == numpy.int16)| (t == numpy.int32):
+			return('D')
+		elif (t == numpy.float) | (t == numpy.float32)|(t == numpy.float64):
+			return('F')
+		elif (t == numpy.str) | (isinstance(val[0], str)):
+			_len = numpy.max([len(k) for k in val])
+			return(str(_len)+'A')
+		elif t == numpy.short:
+			return('I')
+		elif (t == numpy.int32) | (t == numpy.int64):
+			return('F')
+		else:
+			print "WARNING: type conversion not found", t
+
+	def readHeader(self, hdu):
+		header = TableHeader()
+		genTerms = [ 'XTENSION', 'BITPIX', 'NAXIS', 'NAXIS1',
+			     'NAXIS2', 'PCOUNT', 'GCOUNT', 'TFIELDS'  ]
+		fieldTerms = ['TTYPE', 'TFORM', 'TUNIT']
+		for k in hdu.header:
+			if (not k in genTerms) & (not k[:5] in fieldTerms):
+				header[k] = hdu.header[k]
+		if 'EXTNAME' in hdu.header:
+			header['NAME'] =  hdu.header['EXTNAME']
+		return header
+
+	def _readColComments(self, card):
+		ttype =  str(card).split('/')
+		if len(ttype) > 1:
+			return ' '.join(ttype[-1].split())
+		else:
+			return None
 		
-				hd5.close()
-				if not silent: print "Data exported into %s" % output
-
-	register_extension(hd5Manager(), 'hd5')
-	register_extension(hd5Manager(), 'hdf5')
+	def _readColProxy(self, hdu, name, unit, comment):
+		""" 
+		-- Internal use -- 
+		returns a TableColumnProxy that reads the column on demand
+		"""
+		fmt = hdu.data.dtype.fields[name][0]
+		header = TableColumnHeader(name, fmt.base, unit, comment)
+		return TableColumnProxy(lambda: numpy.array(hdu.data.field(name)),
+				header, (len(hdu.data),) + fmt.shape)
+
+	def _readColView(self, hdu, name, unit, comment):
+		""" 
+		-- Internal use -- 
+		returns a TableColumn sharing the memory of the (memory
+		mapped) hdu data
+		"""
+		col = hdu.data.field(name).view(TableColumn)
+		col.header = TableColumnHeader(name, col.dtype, unit, comment)
+		return col
 
-	
-except:
-	print "Warning: HD5 files could not be managed."
+	def readData(self, hdu, lazy=False, memmap=False):
+		colDef = hdu.columns
+		names = [ k.name for k in colDef ]
+		units = [ k.unit for k in colDef ]
+		#comms = [ k.comment for k in colDef ]
+		comms = [ self._readColComments(k) for k in hdu.header.ascard['TTYPE*'] ]
+		if memmap:
+			return [ self._readColView(hdu, names[k], units[k], comms[k]) \
+					for k in range(len(names)) ]
+		if lazy:
+			return [ self._readColProxy(hdu, names[k], units[k], comms[k]) \
+					for k in range(len(names)) ]
+		data  = [ TableColumn(hdu.data.field(names[k]), \
+					name=names[k], \
+					unit=units[k], \
+					description=comms[k] )\
+					for k in range(len(names)) ]
+		return data	
+
+	def read(self, filename, extension = 1, lazy=False, memmap=False,
+			mode='readonly', **kwargs):
+		"""
+		read a FITS table
+		inputs:
+			filename -- file to read from
+		keywords:
+			extension -- extension of the table (def: 1)
+			lazy      -- if set, the file is kept opened and the
+				     columns are only read on first access
+			memmap    -- if set, the file is memory mapped and kept
+				     opened. Columns are views of the binary
+				     table (no copy): only the accessed parts
+				     are read from the disk.
+			mode      -- opening mode of the memory mapped file
+				     (def: 'readonly', see pyfits.open)
+		"""
+		if memmap:
+			hdu = pyfits.open(filename, memmap=True, mode=mode)
+		elif lazy:
+			hdu = pyfits.open(filename, memmap=True)
+		else:
+			hdu = pyfits.open(filename)
+		header = self.readHeader(hdu[extension])	
+		data   = self.readData(hdu[extension], lazy=lazy, memmap=memmap)
+		if lazy | memmap:
+			header['_sourceFile'] = hdu
+		else:
+			hdu.close()
+		return data, header
 
+	def writeColComment(self, header, colName, comment):
+		cards = header.ascard['TTYPE*']
+		refs = {}
+		for k in cards: refs[k.value] = k.key
+		header.update(refs[colName], colName, comment=comment) 
 
-def load(filename, type=None, manager=None, distributed=False, storage=None, silent=False, **kwargs):
-	""" Generates a Table object from a given file
-		Basically it creates an empty Table object and call the
-		Table.read() method to fill the table
-		
-	inputs:
-		filename  -- [ string ]
-			     file to read from
-
-	keywords:
-		type     -- [ string ]
-			    if specified, this will force the function
-			    to use considered the file to be of this
-			    type.
-		manager  -- [ TableManager ]
-			    If specified, it will use this format
-			    manager (even if not registered)
-	     distributed -- generate a distributedTable object (BETA)
-		**kwargs are sent to the TableManager.read function
-	"""
-	if distributed:
-		t = distributedTable(storage)
-	else:
-		t = Table()
-	t.read(filename, type=type, manager=manager, silent=silent, **kwargs)
-	return t
+	def write(self, data, header=None, output='exportedData.fits', fmt=None,
+		name=None, comments=None, units=None, clobber=False, append=True, global_attrs=None,
+		silent=False, hdr_only = False, keep_open = False, hdr0 = None):
+		"""
+		export data to a FITS file
 
-try:
-	from scipy import io
-	def idlload(filename, distributed=False, storage=None, **kwargs):
-		""" A shortcut to open an IDL save file into a list of recarrays 
-			
 		inputs:
-			filename  -- [ string ]
-				     file to read from
+			data -- data dictionnary to export
+		
+		outputs:
+			output -- output file (def: exportedData.dat)
 
 		keywords:
-		
-			**kwargs are sent to the scipy.io.idl.readsav function
+			fmt     -- force a given column format 
+			             (alphabetic data name order)
+			name    -- extention name of the fits file (def: DATA)
+			header  -- dictonnary of keywords and corresponding 
+				   values
+			comments-- list of column comments
+			units   -- list of column units
+			global_attrs   -- dictonnary of keywords to add to the
+					  main container. (or update; No need
+					  to include other keywords to do so.)
+			clobber -- overwrite if set (def: False)
+			append  -- add data to existing file (def: True)
 		"""
-		return io.idl.readsav(filename, **kwargs)
-except:
-	print "Warning: IDL savefiles could not be managed. (req: scipy.io.idl)"
+		if (not os.path.isfile(output)) & append: 
+			if not silent: 
+				print "Warning: %s does not seem to exist" % output
+				print "         Creating a new file."
+			append=False	
+
+		if data != None:
+			keys = data.keys()
+			indkeys = numpy.argsort(data.keys())
+			if fmt == None:
+				fmt = [ self._getFitsFmt(data[k]) for k in keys ]
+			if (comments == None) | len(comments) != len(data) :
+				comments = [None]*len(data)	
+			if (units == None) | len(units) != len(data) :
+				units = [None]*len(data)	
+			cols = [ pyfits.Column( name=keys[ik],        \
+						array=data[keys[ik]], \
+						format=fmt[ik],       \
+						unit=units[ik]      ) \
+						for ik in indkeys  ]
+			hdr = pyfits.new_table(cols)
+			hdr.header.update('EXTNAME', name or header['NAME'])
+			hdr.header.update('FILENAME', output.split('/')[-1])
+			if header != None:
+				for k in header:
+					if (k != 'COMMENT') & (k != 'HISTORY'):
+						hdr.header.update(k, header[k])	
+					else:
+						txt = header[k].split('\n')
+						for j in txt:
+							if k == 'COMMENT':
+								hdr.header.add_comment(j)	
+							elif k == 'HISTORY':
+								hdr.header.add_history(j)	
+			for ik in range(len(keys)):
+				if comments[ik] != None:
+					self.writeColComment(hdr.header, keys[ik], comments[ik])
+			if hdr_only:
+				return hdr
+
+			if not append:
+				hdr.writeto(output,clobber=clobber)
+				if not silent: 
+					print "Data exported into %s" % output
+			else:
+				if hdr0 == None:
+					retHdr = True
+					hdr0 = pyfits.open(output, mode='append')
+				else:
+					retHdr = False
+
+				hdr0.append(hdr)
+				if not keep_open:
+					hdr0.flush()
+					hdr0.close()
+				else:
+					if retHdr: return hdr0
+				if not silent: 
+					print "Data added into %s" % output
 
+		if global_attrs != None: 
+			if hdr0 == None:
+				hdr0 = pyfits.open(output, mode='update')
+			for k in global_attrs:
+				hdr0[0].header.update(k, global_attrs[k])	
+			hdr0.flush()
+			hdr0.close()
+			if not silent: 
+				print "Keywords added to main table into %s" % output
 
+register_extension('fitsManager', 'fits')
 
-try:
-	import sqlite3
-	
-	class sqlManager(TableManager):
+
+class hd5Manager(TableManager):
 
 		def __init__(self):
 			""" constructor """
-			TableManager.__init__(self, tableType='sql')
+			TableManager.__init__(self, tableType='hd5', requires=['tables'])
 
-		def getTableNames(self, *args, **kwargs):
-			node = self.c.execute("SELECT name FROM sqlite_master WHERE type='table';")
-			return [ t[0] for t in node if t[0][0] != '_' ]
-		
-		def execute(self, txt, *args, **kwargs):
-			return self.c.execute(txt)
 
-		def readCol(self, k):
-			r = self.execute('select %s from %s;' % (k, self.tableName)).fetchall()
-			return TableColumn(numpy.asarray([ rk[0] for rk in r]), name=k)
-		
-		def readTabHeader(self):
-			""" assumes dr is a table with keyname, value in
-			'_tableName_' """
-			hdr = TableHeader()
+		def _getValClass(self, val):
 			try:
-				r = self.c.execute('select * from %s' % '_'+self.tableName+'_')
-				names = [rk[0] for rk in r.description]
-				vals  = [rv for rv in r.fetchall()[0]]
-				for k in range(len(names)):
-					hdr[names[k]] = vals[k]
-				del r, names, vals
+				t = type(val[0])
 			except:
-				pass
-			return hdr
-			
-		def read(self, filename, tableName=None, silent=False, *args, **kwargs):
-			self.source = sqlite3.connect(filename, *args, **kwargs)
-			self.c = self.source.cursor()
-			#TODO self.cache = False
-			if 'tablename' in kwargs:
-				tableName = kwargs['tablename']
-			if tableName == None:
-				tableName = self.getTableNames()[0]
-			if not silent:
-				print "\tLoading table: %s" % tableName
-			self.tableName = tableName
-
-			r = self.c.execute('select * from %s' % tableName)
-			colnames = [ t[0] for t in r.description ]
-			data = [self.readCol(k) for k in colnames]
-
-			head = self.readTabHeader()
-			head['_sourceFile'] = self.source
-
-			if 'NAME' not in head or head['NAME']=='Noname' or head['NAME'] == None:
-				head['NAME'] = tableName
-			return data, head
+				t = type(val)
+			if (t == numpy.str) | (t==numpy.string_):
+				return('StringCol')
+			else:
+				t = type(numpy.max(val))
+				if t == numpy.int:
+					return('IntCol')
+				elif (t == numpy.float):
+					return('FloatCol')
+				elif (t == numpy.bool):
+					return('BoolCol')
+				elif (t == numpy.complex):
+					return('ComplexCol')
+				elif (t == numpy.float32):
+					return('Float32Col')
+				elif (t == numpy.float64):
+					return('Float64Col')
+				elif (t == numpy.short) | (t == numpy.int8):
+					return('Int8Col')
+				elif (t == numpy.int16):
+					return('Int16Col')
+				elif (t == numpy.int32):
+					return('Int32Col')
+				elif (t == numpy.int64):
+					return('Int64Col')
+				else:
+					print "Warning: type unknown!", t
 
-		def _getSQLFmt(self, val):
+		def _getExtendedFmt(self, val, pos=0):
+			"""
+			return the format string to use while defining
+			the pyTable description class.
+			In this context, this has been extended to account for
+			multidimentional values.
+			input:
+				val -- column of values to define
+				pos -- position of the column (def: 0)
+			outputs:
+				type -- the string declaration
+			"""
+			if (not _isiterable(val[0])) :
+				return self._getHD5Fmt(val,pos=pos)
+			else:
+				_val = val[0]
+				s = numpy.shape(_val)
+				_class = self._getValClass(_val)
+				_args = ""
+				if _class == 'StringCol':
+					_len = numpy.max([len(k) for k in _val])
+					_args = str(_len)
+				_args += 'shape='+str(s)+',pos='+str(pos)
+				return(_class+'('+_args+')')
+
+		def _getHD5Fmt(self, val, pos=0):
 			"""
 			-- Internal use -- 
 			return the format string to use while defining
-			the Table description.
+			the pyTable description class.
 			input:
 				val -- column of values to define
+				pos -- position of the column (def: 0)
 			outputs:
 				type -- the string declaration
 			"""
@@ -2144,40 +4560,248 @@ try:
 				t = type(val[0])
 			except:
 				t = type(val)
-			if (t == numpy.str) | (t==numpy.string_) | (t==numpy.unicode_) | (t==unicode):
+			if (t == numpy.str) | (t==numpy.string_):
 				_len = numpy.max([len(k) for k in val])
-				return('TEXT')
+				return('StringCol('+str(_len)+",pos="+str(pos)+')')
 			else:
 				t = type(numpy.max(val[:]))
 				if t == numpy.int:
-					return('INTEGER')
+					return('IntCol(pos='+str(pos)+')')
 				elif (t == numpy.float):
-					return('REAL')
+					return('FloatCol(pos='+str(pos)+')')
+				elif (t == numpy.bool):
+					return('BoolCol(pos='+str(pos)+')')
+				elif (t == numpy.complex):
+					return('ComplexCol(pos='+str(pos)+')')
 				elif (t == numpy.float32):
-					return('REAL')
+					return('Float32Col(pos='+str(pos)+')')
 				elif (t == numpy.float64):
-					return('REAL')
-				elif (t == numpy.short) | (t == numpy.int8) | (t == numpy.uint8):
-					return('INTEGER')
+					return('Float64Col(pos='+str(pos)+')')
+				elif (t == numpy.short) | (t == numpy.int8):
+					return('Int8Col(pos='+str(pos)+')')
 				elif (t == numpy.int16):
-					return('INTEGER')
+					return('Int16Col(pos='+str(pos)+')')
 				elif (t == numpy.int32):
-					return('INTEGER')
+					return('Int32Col(pos='+str(pos)+')')
 				elif (t == numpy.int64):
-					return('INTEGER')
-				elif (t == None):
-					return('NULL')
+					return('Int64Col(pos='+str(pos)+')')
 				else:
 					print "Warning: type unknown!", t
+		
+		def readColDesc(self, tab, name):
+			key = [ k for k in tab.attrs._v_attrnames \
+					if tab.attrs[k] == name ]
+
+			key = key[0].replace('NAME', '')
+			if key+'UNIT' in tab.attrs: 
+				unit = tab.attrs[key+'UNIT']
+			else: 
+				unit = None
+			if key+'DESC' in tab.attrs: 
+				desc = tab.attrs[key+'DESC']
+			else:
+				desc = None
+			return (unit, desc)
+
+		def readCol(self, tab, colName):
+				cunit, cdesc = self.readColDesc(tab, colName)	
+				return TableColumn(tab.col(colName), 
+							name = colName, 
+							unit=cunit,
+							description=cdesc)
+
+		def readColProxy(self, tab, colName):
+				""" returns a TableColumnProxy that reads the
+				column on demand """
+				cunit, cdesc = self.readColDesc(tab, colName)	
+				ctype = tab.coldtypes[colName]
+				header = TableColumnHeader(colName, ctype.base, cunit, cdesc)
+				return TableColumnProxy(lambda: tab.col(colName), header,
+						(tab.nrows,) + ctype.shape)
+		def readTabHeader(self, tab):
+			head = TableHeader()
+			exclude = ['NROWS', 'VERSION', 'CLASS', 'EXTNAME']
+			for k in tab.attrs._v_attrnames:
+				if (not k in exclude) & (k[:5] != 'FIELD'):
+					head[k] = tab.attrs[k]
+			return head
+
+		def read(self, filename, tableName=None, silent=False, lazy=True, *args, **kwargs):
+			"""
+			read a table from a HDF5 file (the file is kept opened
+			as the table source)
+			inputs:
+				filename  -- file to read from
+			keywords:
+				tableName -- table node to read (def: first node)
+				lazy      -- columns are only read on first access
+					     (def), so that where/selectWhere
+					     conditions can be evaluated in-kernel
+			"""
+			source = tables.openFile(filename, *args, **kwargs)
+			if 'tablename' in kwargs:
+				tableName = kwargs['tablename']
+			if tableName == None:
+				node = source.listNodes('/')[0]
+				tableName = node.name
+			else:
+				if tableName[0] != '/': tableName = '/'+tableName
+				node = source.getNode(tableName)
+			if not silent:
+				print "\tLoading table: %s" % tableName
+			if lazy:
+				data = [self.readColProxy(node, k) for k in node.colnames]
+			else:
+				data = [self.readCol(node, k) for k in node.colnames]
+			head = self.readTabHeader(node)
+			head['_sourceFile'] = source
+			head['_sourceTable'] = node
+			if 'NAME' not in head or head['NAME']=='Noname' or head['NAME'] == None: 
+				head['NAME'] = tableName
+			if 'TITLE' not in head or head['TITLE']=='': 
+				head['TITLE'] = node.title
+			return data, head
+		
+		def writeColDesc(self, tab, name, unit=None, desc=None):
+			key = [ k for k in tab.attrs._v_attrnames \
+					if tab.attrs[k] == name ]
+
+			key = key[0].replace('NAME', '')
+			tab.attrs[key+'UNIT'] = unit
+			tab.attrs[key+'DESC'] = desc
+			
+			
+		def getWhereList(self, table, condition, condvars=None, 
+				start=None, stop=None, step=None):
+			""" Returns the indices of the rows of the table
+			source fulfilling the condition (in-kernel query)
+			or None if the condition cannot be translated """
+			cond = _translateCondition(condition, table._sourceCols, condvars)
+			if (cond == None) or self._loaded(table, condition):
+				return None
+			return table.sourceTable.getWhereList(cond[0], condvars=cond[1],
+					start=start, stop=stop, step=step)
+
+		def readWhere(self, table, condition, condvars=None, fields=None,
+				start=None, stop=None, step=None):
+			""" Returns the columns of the rows of the table source
+			fulfilling the condition (in-kernel query) or None if
+			the condition cannot be translated """
+			cond = _translateCondition(condition, table._sourceCols, condvars)
+			if cond == None:
+				return None
+			if fields == None:
+				fields = table.keys()
+			if not set(fields).issubset(table._sourceCols):
+				return None
+			if self._loaded(table, condition, fields):
+				return None
+			r = table.sourceTable.readWhere(cond[0], condvars=cond[1],
+					start=start, stop=stop, step=step)
+			data = []
+			for k in fields:
+				col = TableColumn(r[k])
+				col.header = table.getColHeader(k).copy()
+				data.append(col)
+			return data
+
+		def createIndex(self, table, name, index):
+			""" creates the PyTables index of a column so that the
+			in-kernel queries use it (requires a writable file) """
+			try:
+				table.sourceTable.cols._f_col(name).createIndex()
+			except Exception, e:
+				warnings.warn("Index of %s could not be stored: %s" % (name, e))
+
+		def _newTableClass(self, data, keys):
+			""" 
+			-- Internal use --
+			generate a table description class associated to data
+			"""
+			code = 'class newTable(tables.IsDescription):'
+			pos = 0
+			for k in keys:
+				ktype = self._getExtendedFmt(data[k], pos)
+				code +="\n\t"+ k + "= tables." + ktype 
+				pos += 1
+			exec(code)	
+			return newTable
+
+		def _getTable(self, hd5, data, keys, group='/', 
+				tablename='data', appendTable=False,
+				silent=False, expectedrows=None):
+			""" 
+			-- Internal use --
+			return the table node to write into, creating it from
+			the data if needed
+			"""
+			if expectedrows == None:
+				expectedrows = numpy.size(data[keys[0]], 0)
+			if not appendTable:
+				newTable = self._newTableClass(data, keys)
+				try:
+					if group[-1] == '/':
+						group = group[:-1]
+					table = hd5.createTable(group, tablename, newTable, expectedrows = expectedrows, createparents=True)
+					hd5.flush()
+				except:
+					if not silent:
+						print "Warning: Table creation exception. Table may already exist."
+					table = hd5.getNode(group+tablename)
+			else:
+				try:
+					table = hd5.getNode(group+tablename)
+				except tables.NoSuchNodeError:
+					newTable = self._newTableClass(data, keys)
+					if group[-1] == '/':
+						group = group[:-1]
+					table = hd5.createTable(group, tablename, newTable, expectedrows = expectedrows, createparents=True)
+					hd5.flush()
+			return table
+
+		def _appendData(self, table, data, keys, chunksize=100000):
+			""" 
+			-- Internal use --
+			append data to the table by chunks of rows. Each chunk is
+			copied into a structured array that is appended at once.
+			"""
+			nrows = numpy.size(data[keys[0]], 0)
+			chunksize = max(int(chunksize), 1)
+			buf = numpy.empty(min(chunksize, nrows), dtype=table.dtype)
+			for i0 in range(0, nrows, chunksize):
+				i1 = min(i0 + chunksize, nrows)
+				for k in keys:
+					buf[k][:i1-i0] = numpy.asarray(data[k])[i0:i1]
+				table.append(buf[:i1-i0])
+			table.flush()
+
+		def write(self, data, header=None,
+				output='exportedData.hd5', tablename='data', 
+				mode='w', group='/', silent=False,
+				units=None, comments=None,
+				appendTable=False, chunksize=100000, **kwargs):
+			"""
+			export data to a HDF5 file
 
-		def write(self, data, header=None, output='exportedData.sqlite', 
-					tablename=None, silent=False, units=None, 
-					comments=None, **kwargs):
+			inputs:
+				data -- data dictionnary to export
 			
+			outputs:
+				output -- output file (def: exportedData.dat)
+
+			keywords:
+				tablename -- table name to create/modify (def: 'data')
+				mode      -- 'w' will create a brand new file (default)
+					     'a' will append an existing file (useful to add
+					     tables in an existing file)
+				group     -- path to the table (def: '/') 
+				header    -- Dictionnary of attributes to add to the table
+				silent    -- Do not print any message when set
+				chunksize -- number of rows appended at once
+			"""
 			if header != None:
 				if 'NAME' in header:
-					if tablename == None:
-						tablename = header['NAME'].replace('.','_')
+					tablename = header['NAME'].replace('.','_')
 			if (comments == None) | len(comments) != len(data) :
 				comments = [None]*len(data)	
 			if (units == None) | len(units) != len(data) :
@@ -2185,82 +4809,891 @@ try:
 
 			keys = data.keys()
 			keys.sort()
+			if appendTable == True:
+				mode = 'a'
+			hd5 = tables.openFile(output, mode=mode)
+
+			table = self._getTable(hd5, data, keys, group=group,
+					tablename=tablename, appendTable=appendTable,
+					silent=silent)
+			self._appendData(table, data, keys, chunksize=chunksize)
+			if header != None:
+				for k in header:
+					table.attrs[k] = header[k]
+				if not 'TITLE' in header:
+					table.attrs['TITLE'] = tablename
+			
+			for ik in range(len(keys)):
+				self.writeColDesc(table, keys[ik], units[ik], comments[ik])
+	
+			hd5.close()
+			if not silent: print "Data exported into %s" % output
+
+		def writer(self, output, tablename='data', mode='w', group='/', 
+				header=None, chunksize=100000, expectedrows=None,
+				silent=False):
+			""" Returns a hd5Writer object that streams data chunks
+			into a single table (see hd5Writer) """
+			return hd5Writer(output, tablename=tablename, mode=mode,
+					group=group, header=header,
+					chunksize=chunksize,
+					expectedrows=expectedrows,
+					silent=silent, manager=self)
+
+class hd5Writer(object):
+	""" Stream Table chunks into a single HDF5 table without having
+	the full dataset in memory.
+	The table is created from the first chunk (column names and types)
+	and each following chunk is appended to it.
+
+	> w = mytables.hd5Writer('output.hd5', tablename='data')
+	> for t in mytables.iterload('huge.csv', chunksize=1e6):
+	> 	w.write(t)
+	> w.close()
+
+	it can also be used as a context manager (with statement)
+	"""
+	def __init__(self, output, tablename='data', mode='w', group='/',
+			header=None, chunksize=100000, expectedrows=None,
+			silent=False, manager=None):
+		""" constructor
+		inputs:
+			output    -- output file
+		keywords:
+			tablename -- table name to create/append (def: 'data')
+			mode      -- 'w' creates a brand new file (default)
+				     'a' appends an existing file, data are then
+				     added to the table if it already exists
+			group     -- path to the table (def: '/') 
+			header    -- Dictionnary of attributes to add to the table
+			chunksize -- number of rows appended at once
+			expectedrows -- expected final number of rows (helps
+				     PyTables to optimize the storage)
+		"""
+		self.manager = manager or hd5Manager()
+		self.output = output
+		self.tablename = tablename
+		self.group = group
+		self.mode = mode
+		self.header = header
+		self.chunksize = chunksize
+		self.expectedrows = expectedrows
+		self.silent = silent
+		self.hd5 = tables.openFile(output, mode=mode)
+		self.table = None
+		self.nrows = 0
 
-			txt = 'create table %s \n (' % tablename
-			for k in keys:
-				txt += '%s %s, ' % (k, self._getSQLFmt(data[k]) )
-			txt = txt[:-2]+')'
+	def write(self, data, units=None, comments=None):
+		""" append a chunk of data to the table
+		inputs:
+			data -- Table or dictionary of columns
+		keywords:
+			units    -- list of units (sorted column names order)
+			comments -- list of column descriptions
+		"""
+		if isinstance(data, Table):
+			if self.header == None:
+				self.header = data.header
+			data = data.data
+		keys = data.keys()
+		keys.sort()
+		if self.table == None:
+			if self.header != None:
+				if 'NAME' in self.header:
+					self.tablename = self.header['NAME'].replace('.','_')
+			self.table = self.manager._getTable(self.hd5, data, keys,
+					group=self.group, tablename=self.tablename,
+					appendTable=(self.mode != 'w'), 
+					silent=self.silent,
+					expectedrows=self.expectedrows)
+			if (units == None) or (len(units) != len(keys)):
+				units = [ getattr(getattr(data[k], 'header', None), 'unit', None) for k in keys ]
+			if (comments == None) or (len(comments) != len(keys)):
+				comments = [ getattr(getattr(data[k], 'header', None), 'description', None) for k in keys ]
+			if self.header != None:
+				for k in self.header:
+					self.table.attrs[k] = self.header[k]
+				if not 'TITLE' in self.header:
+					self.table.attrs['TITLE'] = self.tablename
+			for ik in range(len(keys)):
+				self.manager.writeColDesc(self.table, keys[ik], units[ik], comments[ik])
+		self.manager._appendData(self.table, data, keys, chunksize=self.chunksize)
+		self.nrows += numpy.size(data[keys[0]], 0)
 
-			conn = sqlite3.connect(output)
-			c = conn.cursor()
-			print txt
-			c.execute(txt)
-			conn.commit()
-			nrows = len(data[keys[0]])
-			for rk in range(nrows):
-				row = [ str(data[tk][rk]) != 'nan' and str(data[tk][rk]) or 'NULL' for tk in keys ]
-				c.execute("INSERT INTO phat (%s) VALUES (%s);" % (','.join(keys), ','.join(row)))
-			conn.commit()
-			
-			if header != None:
-				keys = header.keys()
-				keys.sort()
-				txt = 'create table _'+tablename+'_ ('
-				for k in keys:
-					txt += '%s %s, ' % (k, self._getSQLFmt([header[k]]) )
-				txt = txt[:-2]+')'
-				c.execute(txt)
-				conn.commit()
-				txt = 'insert into _'+ tablename + '_ values ('+','.join(['?']*len(keys))+')'
-				t = tuple([header[k] for k in keys])
-				c.execute(txt, 	t )
-			conn.commit()
+	def close(self):
+		""" flush and close the file """
+		if self.hd5 != None:
+			self.hd5.close()
+			self.hd5 = None
+			if not self.silent: 
+				print "%d rows exported into %s" % (self.nrows, self.output)
 
+	def __enter__(self):
+		return self
 
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
 
-			
-	register_extension(sqlManager(),   'sql')
-	register_extension(sqlManager(),   'sqlite')
-	register_extension(sqlManager(),   'db')
-except:
-	print "Warning sqlite tables are not managed. (req: sqlite3)"
+register_extension('hd5Manager', 'hd5')
+register_extension('hd5Manager', 'hdf5')
+
+
+
+
+def load(filename, type=None, manager=None, distributed=False, storage=None, silent=False, **kwargs):
+	""" Generates a Table object from a given file
+		Basically it creates an empty Table object and call the
+		Table.read() method to fill the table
+		
+	inputs:
+		filename  -- [ string ]
+			     file to read from
+
+	keywords:
+		type     -- [ string ]
+			    if specified, this will force the function
+			    to use considered the file to be of this
+			    type.
+		manager  -- [ TableManager ]
+			    If specified, it will use this format
+			    manager (even if not registered)
+	     distributed -- generate a distributedTable object (BETA)
+		cache    -- use the parse cache of text tables (see enableCache)
+		**kwargs are sent to the TableManager.read function
+	"""
+	if distributed:
+		t = distributedTable(storage)
+	else:
+		t = Table()
+	t.read(filename, type=type, manager=manager, silent=silent, **kwargs)
+	return t
+
+def iterload(filename, chunksize=100000, type=None, manager=None, silent=False, **kwargs):
+	""" Generates Table objects of at most chunksize rows from a given file
+		The file header is parsed once and each chunk comes with the same
+		column names, units and descriptions. Memory usage is bounded by
+		the chunk size instead of the file size.
+
+		> for t in mytables.iterload('huge.csv', chunksize=1e6):
+		>	...
+
+	inputs:
+		filename  -- [ string ]
+			     file to read from
+
+	keywords:
+		chunksize -- [ int ]
+			     number of rows per generated table
+		type     -- [ string ]
+			    if specified, this will force the function
+			    to use considered the file to be of this
+			    type.
+		manager  -- [ TableManager ]
+			    If specified, it will use this format
+			    manager (even if not registered)
+		**kwargs are sent to the TableManager.iterread function
+	"""
+	if manager == None:
+		if type == None:
+			manager = _determine_type(_extensions, filename, verbose=not silent)
+		else:
+			manager = _determine_type(_extensions, type, verbose=False)
+	for data, description in manager.iterread(filename, chunksize=int(chunksize), **kwargs):
+		t = Table()
+		t._fill(data, description, filename)
+		yield t
+
+def _checkColumn(ref, col, label):
+	""" 
+	-- Internal use --
+	Checks that a column can be stacked with a reference column: same
+	kind of type (numbers or strings), same shape of the values and same
+	header (TableColumnHeader.__eq__: unit, description, null, format).
+	Raises an exception otherwise.
+	"""
+	kinds = [ 'biuf', 'SU' ]
+	sameKind = (col.dtype.kind == ref.dtype.kind) or \
+		numpy.any([ (col.dtype.kind in g) and (ref.dtype.kind in g) for g in kinds ])
+	if not sameKind:
+		raise Exception("Schema mismatch: column %s has type %s, expecting %s" % \
+				(label, col.dtype, ref.dtype))
+	if col.shape[1:] != ref.shape[1:]:
+		raise Exception("Schema mismatch: column %s has shape %s, expecting %s" % \
+				(label, col.shape[1:], ref.shape[1:]))
+	hdr = col.header.copy()
+	hdr['dtype'] = ref.header.dtype
+	if hdr != ref.header:
+		raise Exception("Schema mismatch: column %s is described by (%s), expecting (%s)" % \
+				(label, hdr, ref.header))
+
+def _concatenateColumns(parts, labels=None):
+	""" 
+	-- Internal use --
+	Concatenates the columns of tables sharing the same schema (column
+	names, units, types and shapes). The output columns are allocated once
+	and each part is copied into place. Numerical types and string widths
+	are promoted (see _checkColumn).
+	inputs:
+		parts  -- list of lists of TableColumn (one list per table)
+	keywords:
+		labels -- names of the parts (error messages)
+	outputs:
+		list of TableColumn
+	"""
+	labels = labels or [ 'table %d' % k for k in range(len(parts)) ]
+	names = [ c.header.name for c in parts[0] ]
+	for k in range(1, len(parts)):
+		pnames = [ c.header.name for c in parts[k] ]
+		if sorted(pnames) != sorted(names):
+			raise Exception("Schema mismatch: %s has columns %s, expecting %s" % \
+					(labels[k], pnames, names))
+	parts = [ dict([ (c.header.name, c) for c in p ]) for p in parts ]
+	if len(names) == 0:
+		return []
+	nrows = numpy.sum([ len(p[names[0]]) for p in parts ])
+
+	data = []
+	for name in names:
+		cols = [ p[name] for p in parts ]
+		hdr = cols[0].header
+		for k, c in enumerate(cols):
+			_checkColumn(cols[0], c, '%s of %s' % (name, labels[k]))
+		dtype = numpy.result_type(*[ c.dtype for c in cols ])
+		col = numpy.empty((nrows,) + cols[0].shape[1:], dtype=dtype).view(TableColumn)
+		col.header = TableColumnHeader(name, dtype, hdr.unit, hdr.description,
+						hdr.null, hdr.format)
+		i0 = 0
+		for c in cols:
+			col[i0:i0 + len(c)] = c
+			i0 += len(c)
+		data.append(col)
+	return data
+
+def _loadPart(args):
+	""" 
+	-- Internal use --
+	reads one file for loadmany, returns its columns and header
+	(picklable for process pools) 
+	"""
+	filename, type, manager, kwargs = args
+	t = Table()
+	t.read(filename, type=type, manager=manager, silent=True, **kwargs)
+	data = []
+	for k in t.keys():
+		col = numpy.array(t[k]).view(TableColumn)
+		col.header = t.getColHeader(k).copy()
+		data.append(col)
+	header = dict([ (k, v) for k, v in t.header.iteritems() if k[0] != '_' ])
+	del t
+	return data, header
+
+def loadmany(files, type=None, manager=None, processes=None, threads=None, silent=False, **kwargs):
+	""" Generates one Table object from several files sharing the same
+		schema (column names, units, types). 
+		Files are read concurrently by a pool of processes (or threads)
+		through the registered TableManagers. The final columns are
+		allocated once and each file is copied into place.
+		
+	inputs:
+		files     -- [ string | list ]
+			     list of files or glob pattern (e.g. 'field*.fits')
+
+	keywords:
+		type      -- [ string ]
+			     if specified, this will force the function
+			     to use considered the files to be of this
+			     type.
+		manager   -- [ TableManager ]
+			     If specified, it will use this format
+			     manager (even if not registered)
+		processes -- number of processes (def: number of cpus)
+		threads   -- if set, use this number of threads instead of 
+			     processes (binary formats, small files)
+		**kwargs are sent to the TableManager.read function
+	"""
+	if isinstance(files, str):
+		files = sorted(glob.glob(os.path.expanduser(files)))
+	files = list(files)
+	if len(files) == 0:
+		raise Exception("No file to load")
+	args = [ (f, type, manager, kwargs) for f in files ]
+	if threads is not None:
+		parts = _threadMap(_loadPart, args, threads)
+	else:
+		import multiprocessing
+		processes = processes or multiprocessing.cpu_count()
+		if (processes <= 1) or (len(files) == 1):
+			parts = map(_loadPart, args)
+		else:
+			pool = multiprocessing.Pool(min(processes, len(files)))
+			try:
+				parts = pool.map(_loadPart, args)
+			finally:
+				pool.close()
+				pool.join()
+	data = _concatenateColumns([ p[0] for p in parts ], labels=files)
+	header = parts[0][1]
+	header.pop('SOURCE', None)
+	del parts
+	t = Table()
+	t._fill(data, TableHeader(header))
+	t.header['COMMENT'] = 'Concatenation of %d files' % len(files)
+	if not silent:
+		print "Loaded %d rows from %d files" % (t.nrows, len(files))
+	return t
+
+def idlload(filename, distributed=False, storage=None, **kwargs):
+	""" A shortcut to open an IDL save file into a list of recarrays 
+		
+	inputs:
+		filename  -- [ string ]
+			     file to read from
+
+	keywords:
+	
+		**kwargs are sent to the scipy.io.idl.readsav function
+	"""
+	return _require('scipy.io', 'io').idl.readsav(filename, **kwargs)
+
+
+
+
+class sqlManager(TableManager):
+
+	def __init__(self):
+		""" constructor """
+		TableManager.__init__(self, tableType='sql', requires=['sqlite3'])
+
+	def getTableNames(self, *args, **kwargs):
+		node = self.c.execute("SELECT name FROM sqlite_master WHERE type='table';")
+		return [ t[0] for t in node if t[0][0] != '_' ]
+	
+	def execute(self, txt, *args, **kwargs):
+		return self.c.execute(txt)
+
+	def readCol(self, k):
+		return self.readColumns(self.c, self.tableName, [k])[0]
+
+	def getWhereList(self, table, condition, condvars=None, 
+			start=None, stop=None, step=None):
+		""" Returns the indices of the rows of the table source
+		fulfilling the condition (SQL query) or None if the
+		condition cannot be translated """
+		if (start != None) | (stop != None) | (step != None):
+			return None
+		cond = _translateCondition(condition, table._sourceCols, condvars, dialect='sql')
+		if (cond == None) or self._loaded(table, condition):
+			return None
+		tableName = table.sourceTable
+		txt = 'select rowid - (select min(rowid) from %s) from %s where %s order by rowid' % (tableName, tableName, cond[0])
+		r = table.source.execute(txt, cond[1]).fetchall()
+		return numpy.array([ rk[0] for rk in r ], dtype=int)
+
+	def readWhere(self, table, condition, condvars=None, fields=None,
+			start=None, stop=None, step=None):
+		""" Returns the columns of the rows of the table source
+		fulfilling the condition (SQL query) or None if the
+		condition cannot be translated """
+		if (start != None) | (stop != None) | (step != None):
+			return None
+		cond = _translateCondition(condition, table._sourceCols, condvars, dialect='sql')
+		if cond == None:
+			return None
+		if fields == None:
+			fields = table.keys()
+		if not set(fields).issubset(table._sourceCols):
+			return None
+		if self._loaded(table, condition, fields):
+			return None
+		data = self.readColumns(table.source.cursor(), table.sourceTable,
+				columns=fields, where=cond[0], params=cond[1])
+		for col in data:
+			col.header = table.getColHeader(col.header.name).copy()
+		return data
+
+	def _getNumpyFmt(self, sqltype):
+		""" 
+		-- Internal use -- 
+		return the numpy type associated to a declared sqlite
+		column type (None if the type is not numeric)
+		"""
+		sqltype = str(sqltype).upper()
+		if 'INT' in sqltype:
+			return numpy.int64
+		elif ('REAL' in sqltype) | ('FLOA' in sqltype) | ('DOUB' in sqltype):
+			return numpy.float64
+		else:
+			return None
+
+	def readColumns(self, c, tableName, columns=None, where=None,
+			params=(), arraysize=100000):
+		""" 
+		Read columns of a table with a single query.
+		Rows are fetched by blocks of arraysize rows converted into
+		typed arrays (declared type of the columns). Integer columns
+		with NULL values are read as floats (NaN), numeric columns with
+		non-numeric values (sqlite affinity) as python objects.
+		inputs:
+			c         -- database cursor
+			tableName -- table to read from
+		keywords:
+			columns   -- list of columns to read (def: all)
+			where     -- SQL condition selecting the rows to read
+			params    -- parameters of the condition (for ?
+				     placeholders)
+			arraysize -- number of rows per fetch
+		outputs:
+			list of TableColumn objects
+		"""
+		info = c.execute('PRAGMA table_info(%s);' % tableName).fetchall()
+		sqltypes = dict([ (str(rk[1]), rk[2]) for rk in info ])
+		if columns == None:
+			columns = [ str(rk[1]) for rk in info ]
+		if isinstance(columns, str):
+			columns = [columns]
+		txt = ' from %s' % tableName
+		if where != None:
+			txt += ' where %s' % where
+		#rows in the order of the table
+		txt += ' order by rowid'
+		fmts = [ self._getNumpyFmt(sqltypes.get(k, None)) for k in columns ]
+		#types to fall back to when values do not fit
+		fallback = { numpy.int64: numpy.float64, numpy.float64: None }
+		blocks = [ [] for k in columns ]
+		c.arraysize = arraysize
+		r = c.execute('select %s%s;' % (','.join(columns), txt), params)
+		while True:
+			rows = r.fetchmany()
+			if len(rows) == 0:
+				break
+			vals = zip(*rows)
+			for j in range(len(columns)):
+				while True:
+					try:
+						blocks[j].append(numpy.array(vals[j], dtype=fmts[j] or object))
+						break
+					except (TypeError, ValueError):
+						#NULL (TypeError) or non-numeric values
+						#(ValueError) in a numeric column
+						fmts[j] = fallback[fmts[j]]
+		data = []
+		for j in range(len(columns)):
+			if len(blocks[j]) > 0:
+				col = numpy.concatenate(blocks[j])
+			else:
+				col = numpy.empty(0, dtype=fmts[j] or object)
+			if col.dtype == object:
+				col = numpy.asarray(col.tolist())
+			data.append(TableColumn(col, name=columns[j]))
+		return data
+	
+	def readTabHeader(self):
+		""" assumes dr is a table with keyname, value in
+		'_tableName_' """
+		hdr = TableHeader()
+		try:
+			r = self.c.execute('select * from %s' % '_'+self.tableName+'_')
+			names = [rk[0] for rk in r.description]
+			vals  = [rv for rv in r.fetchall()[0]]
+			for k in range(len(names)):
+				hdr[names[k]] = vals[k]
+			del r, names, vals
+		except:
+			pass
+		return hdr
+		
+	def readColProxy(self, source, tableName, colName, nrows, sqltype, 
+			where=None, params=(), arraysize=100000):
+		""" returns a TableColumnProxy that reads the column on
+		demand """
+		header = TableColumnHeader(colName, 
+				numpy.dtype(self._getNumpyFmt(sqltype) or object))
+		loader = lambda: self.readColumns(source.cursor(), tableName, 
+				[colName], where=where, params=params, 
+				arraysize=arraysize)[0]
+		return TableColumnProxy(loader, header, (nrows,))
+
+	def read(self, filename, tableName=None, silent=False, columns=None,
+			where=None, params=(), arraysize=100000, lazy=True, 
+			*args, **kwargs):
+		"""
+		read a table from a sqlite database (the connection is kept
+		opened as the table source)
+		inputs:
+			filename  -- database file
+		keywords:
+			tableName -- table to read (def: first table)
+			lazy      -- columns are only read on first access (def),
+				     so that where/selectWhere conditions can be
+				     evaluated by SQL queries
+			columns   -- list of columns to read (def: all)
+			where     -- SQL condition selecting the rows to read
+				     e.g. where='x > 3 and y < 2'
+			params    -- parameters of the condition (for ?
+				     placeholders)
+			arraysize -- number of rows fetched at once
+		"""
+		self.source = sqlite3.connect(filename, *args, **kwargs)
+		self.c = self.source.cursor()
+		#TODO self.cache = False
+		if 'tablename' in kwargs:
+			tableName = kwargs['tablename']
+		if tableName == None:
+			tableName = self.getTableNames()[0]
+		if not silent:
+			print "\tLoading table: %s" % tableName
+		self.tableName = tableName
+
+		if lazy:
+			info = self.c.execute('PRAGMA table_info(%s);' % tableName).fetchall()
+			sqltypes = dict([ (str(rk[1]), rk[2]) for rk in info ])
+			if columns == None:
+				columns = [ str(rk[1]) for rk in info ]
+			if isinstance(columns, str):
+				columns = [columns]
+			txt = 'select count(*) from %s' % tableName
+			if where != None:
+				txt += ' where %s' % where
+			nrows = self.c.execute(txt, params).fetchone()[0]
+			data = [ self.readColProxy(self.source, tableName, k, nrows, 
+					sqltypes.get(k, None), where=where, params=params,
+					arraysize=arraysize) for k in columns ]
+		else:
+			data = self.readColumns(self.c, tableName, columns=columns,
+					where=where, params=params, arraysize=arraysize)
+
+		head = self.readTabHeader()
+		head['_sourceFile'] = self.source
+		if where == None:
+			#only tables with contiguous row ids can give row indices
+			r = self.c.execute('select min(rowid), max(rowid), count(*) from %s' % tableName).fetchone()
+			if (r[2] == 0) or (r[1] - r[0] + 1 == r[2]):
+				head['_sourceTable'] = tableName
+
+		if 'NAME' not in head or head['NAME']=='Noname' or head['NAME'] == None:
+			head['NAME'] = tableName
+		return data, head
+
+	def _getSQLFmt(self, val):
+		"""
+		-- Internal use -- 
+		return the format string to use while defining
+		the Table description.
+		input:
+			val -- column of values to define
+		outputs:
+			type -- the string declaration
+		"""
+		try:
+			t = type(val[0])
+		except:
+			t = type(val)
+		if (t == numpy.str) | (t==numpy.string_) | (t==numpy.unicode_) | (t==unicode):
+			_len = numpy.max([len(k) for k in val])
+			return('TEXT')
+		else:
+			t = type(numpy.max(val[:]))
+			if t == numpy.int:
+				return('INTEGER')
+			elif (t == numpy.float):
+				return('REAL')
+			elif (t == numpy.float32):
+				return('REAL')
+			elif (t == numpy.float64):
+				return('REAL')
+			elif (t == numpy.short) | (t == numpy.int8) | (t == numpy.uint8):
+				return('INTEGER')
+			elif (t == numpy.int16):
+				return('INTEGER')
+			elif (t == numpy.int32):
+				return('INTEGER')
+			elif (t == numpy.int64):
+				return('INTEGER')
+			elif (t == None):
+				return('NULL')
+			else:
+				print "Warning: type unknown!", t
+
+	def _iterRows(self, data, keys, batchsize=100000):
+		""" 
+		-- Internal use -- 
+		Generates lists of rows (tuples of python values) from the
+		columns by batches of rows. NaN values are converted to NULL.
+		"""
+		cols = [ numpy.asarray(data[k]) for k in keys ]
+		nrows = len(cols[0])
+		for i0 in range(0, nrows, batchsize):
+			block = []
+			for col in cols:
+				b = col[i0:i0+batchsize]
+				if b.dtype.kind == 'f':
+					ind = numpy.isnan(b)
+					if ind.any():
+						b = b.astype(object)
+						b[ind] = None
+				block.append(b.tolist())
+			yield zip(*block)
+
+	def write(self, data, header=None, output='exportedData.sqlite', 
+				tablename=None, silent=False, units=None, 
+				comments=None, append=False, indexes=None,
+				batchsize=100000, **kwargs):
+		"""
+		export data to a sqlite database
+
+		inputs:
+			data -- data dictionnary to export
+		
+		outputs:
+			output -- output file (def: exportedData.sqlite)
+
+		keywords:
+			tablename -- table name to create/modify 
+				     (def: header['NAME'] or 'data')
+			header    -- Dictionnary of attributes to store in
+				     the '_tablename_' table
+			append    -- add rows to the table if it already
+				     exists
+			indexes   -- list of columns to index once the data
+				     are loaded
+			batchsize -- number of rows inserted per executemany
+				     call
+			silent    -- Do not print any message when set
+
+		The table creation, the rows, the header table and the
+		indexes are written in a single transaction: nothing is
+		written if any of them fails.
+		"""
+		if header != None:
+			if 'NAME' in header:
+				if tablename == None:
+					tablename = header['NAME'].replace('.','_')
+		if tablename == None:
+			tablename = 'data'
+		if (comments == None) | len(comments) != len(data) :
+			comments = [None]*len(data)	
+		if (units == None) | len(units) != len(data) :
+			units = [None]*len(data)	
+
+		keys = data.keys()
+		keys.sort()
+
+		#transactions are handled here: python sqlite3 would otherwise
+		#commit implicitly before each create statement
+		conn = sqlite3.connect(output, isolation_level=None)
+		try:
+			c = conn.cursor()
+			r = c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?;", (tablename,))
+			exists = len(r.fetchall()) > 0
+			if exists & (not append):
+				raise Exception("Table %s already exists in %s" % (tablename, output))
+			c.execute('BEGIN')
+			try:
+				if not exists:
+					txt = 'create table %s \n (' % tablename
+					for k in keys:
+						txt += '%s %s, ' % (k, self._getSQLFmt(data[k]) )
+					txt = txt[:-2]+')'
+					c.execute(txt)
+
+				txt = "INSERT INTO %s (%s) VALUES (%s);" % (tablename, 
+						','.join(keys), ','.join(['?']*len(keys)))
+				for rows in self._iterRows(data, keys, batchsize=batchsize):
+					c.executemany(txt, rows)
+				
+				if (header != None) & (not exists):
+					hkeys = header.keys()
+					hkeys.sort()
+					txt = 'create table _'+tablename+'_ ('
+					for k in hkeys:
+						txt += '%s %s, ' % (k, self._getSQLFmt([header[k]]) )
+					txt = txt[:-2]+')'
+					c.execute(txt)
+					txt = 'insert into _'+ tablename + '_ values ('+','.join(['?']*len(hkeys))+')'
+					t = tuple([header[k] for k in hkeys])
+					c.execute(txt, 	t )
+
+				if indexes != None:
+					if isinstance(indexes, str):
+						indexes = [indexes]
+					for k in indexes:
+						c.execute('CREATE INDEX IF NOT EXISTS _%s_%s_ ON %s (%s);' % (tablename, k, tablename, k))
+				c.execute('COMMIT')
+			except:
+				#nothing is written if any statement fails
+				c.execute('ROLLBACK')
+				raise
+		finally:
+			conn.close()
+		if not silent: print "Data exported into %s" % output
+
+register_extension('sqlManager', 'sql')
+register_extension('sqlManager', 'sqlite')
+register_extension('sqlManager', 'db')
 
 #==============================================================================
 # Table manipulations
 #==============================================================================
 
+def _groupCodes(keys):
+	""" 
+	-- Internal use --
+	Returns integer codes of (multi-column) keys such that equal keys get
+	equal codes. Codes are consecutive and follow the order of the keys.
+	inputs:
+		keys -- list of key columns 
+	"""
+	code = None
+	for c in keys:
+		u, inv = numpy.unique(numpy.asarray(c), return_inverse=True)
+		if code is None:
+			code = inv
+		else:
+			code = numpy.unique(code * len(u) + inv, return_inverse=True)[1]
+	return code
+
+def _factorize(keys1, keys2):
+	""" 
+	-- Internal use --
+	Returns integer codes of (multi-column) keys of two tables such that
+	equal keys get equal codes.
+	inputs:
+		keys1 -- list of key columns of table 1
+		keys2 -- list of key columns of table 2
+	"""
+	n1 = len(keys1[0])
+	code = _groupCodes([ numpy.concatenate([numpy.asarray(c1), numpy.asarray(c2)]) \
+				for c1, c2 in zip(keys1, keys2) ])
+	return code[:n1], code[n1:]
+
+def _matchCounts(c1, c2):
+	""" 
+	-- Internal use --
+	Sort-merge matching of two key columns
+	outputs:
+		order -- sorting order of c2 (stable)
+		lo    -- position of the first match of each c1 value in c2[order]
+		counts-- number of matches of each c1 value
+	"""
+	c1 = numpy.asarray(c1)
+	c2 = numpy.asarray(c2)
+	order = numpy.argsort(c2, kind='mergesort')
+	s2 = c2[order]
+	lo = numpy.searchsorted(s2, c1, 'left')
+	counts = numpy.searchsorted(s2, c1, 'right') - lo
+	if c1.dtype.kind in 'fc':
+		#NaN never match
+		counts[numpy.isnan(c1)] = 0
+	return order, lo, counts
+
+def _expandMatches(order, lo, counts):
+	""" 
+	-- Internal use --
+	Returns the indices of all matching pairs (many-to-many) 
+	"""
+	ind1 = numpy.repeat(numpy.arange(len(counts)), counts)
+	offsets = numpy.arange(counts.sum()) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+	ind2 = order[numpy.repeat(lo, counts) + offsets]
+	return ind1, ind2
+
 def match(c1,c2):
 	""" Returns the indices at which the tables match 
 	matching uses 2 columns (arrays) that are compared in values
+	The matching is based on sorting (O(N log N)) and manages
+	many-to-many matches.
 	INPUTS:
-		c1 -- array 1
-		c2 -- array 2
+		c1 -- array 1 (or list of arrays for multi-column keys)
+		c2 -- array 2 (or list of arrays for multi-column keys)
 
 	OUTPUS:
 		tuple of both indices list where the two columns match.
 	"""
-	return numpy.where(numpy.equal.outer(c1,c2))
+	if isinstance(c1, (list, tuple)):
+		c1, c2 = _factorize(c1, c2)
+	order, lo, counts = _matchCounts(c1, c2)
+	return _expandMatches(order, lo, counts)
 
-def join(t1,t2, n1, n2):
+def _takeFill(col, ind, null=None):
+	""" 
+	-- Internal use --
+	Returns col[ind] where negative indices correspond to missing values.
+	Missing values are set to null if provided, otherwise to NaN (integer
+	columns are then converted to floats) or '' for strings.
+	"""
+	col = numpy.asarray(col)
+	missing = ind < 0
+	if not missing.any():
+		return col[ind]
+	r = numpy.zeros((len(ind),) + col.shape[1:], dtype=col.dtype)
+	r[~missing] = col[ind[~missing]]
+	if col.dtype.kind in 'SUa':
+		fill = ''
+	elif null is not None:
+		fill = null
+	else:
+		fill = numpy.nan
+	if (col.dtype.kind in 'iub') and isinstance(fill, float) and numpy.isnan(fill):
+		r = r.astype(float)
+	r[missing] = fill
+	return r
+
+def join(t1,t2, n1, n2, how='inner'):
 	""" returns a table containing matching lines 
 	This will create a table containing both tables columns with matching
 	lines only. (units and descriptions are preserved throught the join but
 	not the headers)
+	The join is a sort-merge join (O(N log N) time and O(N) memory) that
+	manages many-to-many matches.
 	
 	INPUTS:
 		t1 -- Table 1 (Table Object)
 		t2 -- Table 2 (Table Object)
-		n1 -- Name of Column 1 (string)
-		n2 -- Name of Column 2 (string)
+		n1 -- Name of Column 1 (string or list of strings)
+		n2 -- Name of Column 2 (string or list of strings)
+
+	KEYWORDS:
+		how -- 'inner' only keeps matching lines (default)
+		       'left'  keeps all the lines of t1
+		       'right' keeps all the lines of t2
+		       'outer' keeps all the lines of both tables
+		       Columns of unmatched lines are filled with the null
+		       value of the column header or NaN ('' for strings)
 	
 	OUTPUTS:
 		Joined Table 
 	"""
-	ind1, ind2 = match(t1[n1], t2[n2])
+	if isinstance(n1, str):
+		n1 = [n1]
+	if isinstance(n2, str):
+		n2 = [n2]
+	assert(len(n1) == len(n2)), "Expecting the same number of keys"
+	if not how in ['inner', 'left', 'right', 'outer']:
+		raise Exception("join type %s is not managed" % how)
+	if len(n1) == 1:
+		c1, c2 = (t1[n1[0]], t2[n2[0]])
+	else:
+		c1, c2 = _factorize([t1[k] for k in n1], [t2[k] for k in n2])
+	if how == 'right':
+		c1, c2 = (c2, c1)
+	order, lo, counts = _matchCounts(c1, c2)
+	ind1, ind2 = _expandMatches(order, lo, counts)
+	if how != 'inner':
+		#unmatched lines of the reference table are kept once
+		extra = numpy.where(counts == 0)[0]
+		ind1 = numpy.concatenate([ind1, extra])
+		ind2 = numpy.concatenate([ind2, -numpy.ones(len(extra), dtype=int)])
+		s = numpy.argsort(ind1, kind='mergesort')
+		ind1, ind2 = (ind1[s], ind2[s])
+	if how == 'right':
+		ind1, ind2 = (ind2, ind1)
+	if how == 'outer':
+		unmatched = numpy.ones(len(c2), dtype=bool)
+		unmatched[ind2[ind2 >= 0]] = False
+		extra = numpy.where(unmatched)[0]
+		ind1 = numpy.concatenate([ind1, -numpy.ones(len(extra), dtype=int)])
+		ind2 = numpy.concatenate([ind2, extra])
+
 	tab = Table(name='Joined Table')
-	# get matching lines
-	r1 = t1[ind1]
-	r2 = t2[ind2]
 	# get column names
 	k1 = t1.keys()
 	k2 = t2.keys()
@@ -2271,31 +5704,56 @@ def join(t1,t2, n1, n2):
 			name = k1[k]+'_1'
 		else:
 			name = k1[k]
-		tab.addCol(r1[k1[k]], name=name, 
-				unit=t1[k1[k]].header['unit'],
-				description=t1[k1[k]].header['description'] )	
+		hdr = t1.getColHeader(k1[k])
+		tab.addCol(_takeFill(t1[k1[k]], ind1, hdr['null']), name=name, 
+				unit=hdr['unit'],
+				description=hdr['description'] )	
 	for k in range(len(k2)):
 		if t1.has_key(k2[k]):
 			name = k2[k]+'_2'
 		else:
 			name = k2[k]
-		tab.addCol(r2[k2[k]], name=name,
-				unit=t2[k2[k]].header['unit'],
-				description=t2[k2[k]].header['description'])	
+		hdr = t2.getColHeader(k2[k])
+		tab.addCol(_takeFill(t2[k2[k]], ind2, hdr['null']), name=name,
+				unit=hdr['unit'],
+				description=hdr['description'])	
 	#include header trace
-	if n1 in k2:
-		txt1 = n1+'_1'
-	else:
-		txt1 = n1
-	if n2 in k1:
-		txt2 = n2+'_2'
-	else:
-		txt2 = n2
+	txt1 = ','.join([ (k in k2) and k+'_1' or k for k in n1 ])
+	txt2 = ','.join([ (k in k1) and k+'_2' or k for k in n2 ])
 	tab.header['COMMENT'] = 'Joined table using %s and %s' % (txt1, txt2)
+	if how != 'inner':
+		tab.header['COMMENT'] = '%s join' % how
 
 	return tab
 
 
+def vstack(tables, name=None):
+	""" Stacks tables sharing the same schema (column names, units and
+	descriptions): rows of each table follow the previous ones.
+	Each output column is allocated once.
+
+	INPUTS:
+		tables -- list of Table objects
+
+	KEYWORDS:
+		name   -- name of the output table (def: name of the first table)
+
+	OUTPUTS:
+		Stacked Table 
+	"""
+	tables = list(tables)
+	parts = [ [ t.getCol(k) for k in t.keys() ] for t in tables ]
+	data = _concatenateColumns(parts, labels=[ t.header['NAME'] for t in tables ])
+	header = tables[0].header.copy()
+	if 'SOURCE' in header:
+		header.pop('SOURCE')
+	tab = Table()
+	tab._fill(data, header)
+	if name != None:
+		tab.setName(name)
+	return tab
+
+
 def indent(rows, hasHeader=False, hasUnits=False, headerChar='-', delim=' | ', justify='left',
            separateRows=False, prefix='', postfix='', wrapfunc=lambda x:x):
     """Indents a table by column.
@@ -2344,5 +5802,3 @@ def indent(rows, hasHeader=False, hasUnits=False, headerChar='-', delim=' | ', j
 	hasHeader=False 
 
     return output.getvalue()
-
-